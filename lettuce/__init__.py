@@ -21,7 +21,13 @@ release = 'kryptonite'
 
 import os
 import sys
+import pstats
+import hashlib
+import cPickle
+import cProfile
 import traceback
+import multiprocessing
+from StringIO import StringIO
 try:
     from imp import reload
 except ImportError:
@@ -40,6 +46,7 @@ from lettuce.decorators import step, steps
 from lettuce.registry import call_hook
 from lettuce.registry import STEP_REGISTRY
 from lettuce.registry import CALLBACK_REGISTRY
+from lettuce.timing import clock
 from lettuce.exceptions import StepLoadingError, LettuceRunnerError
 from lettuce.plugins import (
     xunit_output,
@@ -47,6 +54,7 @@ from lettuce.plugins import (
     autopdb,
     smtp_mail_queue,
     jsonreport_output,
+    profile_output,
 )
 from lettuce import fs
 from lettuce import exceptions
@@ -93,15 +101,24 @@ class Runner(object):
                  verbosity=0, no_color=False, random=False,
                  enable_xunit=False, xunit_filename=None,
                  enable_subunit=False, subunit_filename=None,
+                 subunit_chunk_size=None, subunit_max_size=None,
                  enable_jsonreport=False, jsonreport_filename=None,
+                 jsonreport_lines=False,
                  tags=None, failfast=False, auto_pdb=False,
-                 smtp_queue=None, root_dir=None):
+                 smtp_queue=None, root_dir=None, processes=None,
+                 feature_cache=False, stream_results=False,
+                 profile=False, profile_filename=None, pstats_dir=None,
+                 non_tty=False, rerun_failed=False, order=None,
+                 exclude=None):
 
         """ lettuce.Runner will try to find a terrain.py file and
         import it from within `base_path`
         """
 
         self.tags = tags
+        self.processes = processes
+        self.stream_results = stream_results
+        self.pstats_dir = pstats_dir
         self.single_feature = None
 
         if os.path.isfile(base_path) and os.path.exists(base_path):
@@ -109,7 +126,22 @@ class Runner(object):
             base_path = os.path.dirname(base_path)
 
         sys.path.insert(0, base_path)
-        self.loader = fs.FeatureLoader(base_path, root_dir)
+        self.loader = fs.FeatureLoader(base_path, root_dir, exclude)
+        self.feature_cache = None
+        if feature_cache:
+            self.feature_cache = fs.FeatureCache(
+                fs.FileSystem.join(self.loader.base_dir, '.lettuce_cache',
+                                   'features'),
+                version)
+        self.last_run = fs.LastRun(
+            fs.FileSystem.join(self.loader.base_dir, '.lettuce_cache',
+                               'last_run.json'))
+        self.rerun_failed = rerun_failed
+        self.rerun = None
+        self.order = order
+        self.failed_scenarios = {}
+        self.durations = {}
+        self.step_files = {}
         self.verbosity = verbosity
         self.scenarios = scenarios and map(int, scenarios.split(",")) or None
         self.failfast = failfast
@@ -138,21 +170,31 @@ class Runner(object):
             smtp_mail_queue.enable()
 
         if enable_subunit:
-            subunit_output.enable(filename=subunit_filename)
+            subunit_output.enable(filename=subunit_filename,
+                                  chunk_size=subunit_chunk_size,
+                                  max_size=subunit_max_size)
 
         if enable_jsonreport:
-            jsonreport_output.enable(filename=jsonreport_filename)
+            jsonreport_output.enable(filename=jsonreport_filename,
+                                     lines=jsonreport_lines)
 
         reload(output)
+        if non_tty and hasattr(output, 'rewrite_in_place'):
+            output.rewrite_in_place = False
 
         self.output = output
 
-    def run(self):
+        if profile:
+            profile_output.enable(filename=profile_filename)
+
+    def run(self, features_files=None):
         """ Find and load step definitions, and them find and load
-        features under `base_path` specified on constructor
+        features under `base_path` specified on constructor, or only
+        the given `features_files`
         """
-        results = []
-        if self.single_feature:
+        if features_files is not None:
+            features_files = list(features_files)
+        elif self.single_feature:
             features_files = [self.single_feature]
         else:
             features_files = self.loader.find_feature_files()
@@ -163,6 +205,23 @@ class Runner(object):
             self.output.print_no_features_found(self.loader.base_dir)
             return
 
+        last_run = self.last_run.load()
+        if last_run is not None:
+            self.durations.update(last_run['durations'])
+            self.failed_scenarios.update(last_run['failed'])
+            if self.rerun_failed:
+                self.rerun = last_run['failed']
+
+        if self.order:
+            features_files = self._schedule(features_files, last_run)
+
+        if self.rerun is not None:
+            features_files = [filename for filename in features_files
+                              if fs.FileSystem.abspath(filename) in self.rerun]
+            if not features_files:
+                print "No failed scenarios to rerun"
+                return TotalResult([])
+
         # only load steps if we've located some features.
         # this prevents stupid bugs when loading django modules
         # that we don't even want to test.
@@ -172,42 +231,226 @@ class Runner(object):
             print "Error loading step definitions:\n", e
             return
 
+        if self.pstats_dir:
+            self._forget_pstats(features_files)
+
         call_hook('before', 'all')
 
+        started = clock()
+        total = TotalResult([], streaming=self.stream_results)
+        total.discovery = self.loader.discovery
         failed = False
         try:
-            for filename in features_files:
-                feature = Feature.from_file(filename)
-                results.append(
-                    feature.run(self.scenarios,
-                                tags=self.tags,
-                                random=self.random,
-                                failfast=self.failfast))
-
-        except exceptions.LettuceSyntaxError as e:
-            sys.stderr.write(e.msg)
-            failed = True
-        except exceptions.NoDefinitionFound, e:
-            sys.stderr.write(e.msg)
-            failed = True
-        except:
-            if not self.failfast:
-                e = sys.exc_info()[1]
-                print "Died with %s" % str(e)
-                traceback.print_exc()
+            if self.processes > 1 and len(features_files) > 1:
+                failed = self._run_in_processes(features_files, total)
             else:
-                print
-                print ("Lettuce aborted running any more tests "
-                       "because was called with the `--failfast` option")
+                for filename in features_files:
+                    self._add_result(total, self._run_feature(filename),
+                                     filename)
 
-            failed = True
+        except:
+            failed = self._report_failure()
 
         finally:
-            total = TotalResult(results)
-            total.output_format()
+            total.duration = clock() - started
+            self.last_run.store(self.failed_scenarios, self.durations)
+            if self.pstats_dir:
+                self._merge_pstats(features_files)
+
             call_hook('after', 'all', total)
 
             if failed:
                 raise LettuceRunnerError("Test failed.")
 
             return total
+
+    def _run_feature(self, filename):
+        feature = Feature.from_file(filename, cache=self.feature_cache)
+        scenarios = self.scenarios
+        if self.rerun is not None:
+            scenarios = self.rerun[fs.FileSystem.abspath(filename)]
+
+        if not self.pstats_dir:
+            return feature.run(scenarios,
+                               tags=self.tags,
+                               random=self.random,
+                               failfast=self.failfast)
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(feature.run, scenarios,
+                                   tags=self.tags,
+                                   random=self.random,
+                                   failfast=self.failfast)
+        finally:
+            fs.FileSystem.mkdir(self.pstats_dir)
+            profile.dump_stats(self._pstats_filename(filename))
+
+    def _pstats_filename(self, feature_filename):
+        """ Names the profile of a feature after its file name and a hash
+        of its absolute path, so that features never share a profile
+        """
+        path = fs.FileSystem.abspath(feature_filename)
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+        name = '%s-%s.pstats' % (os.path.basename(path), digest)
+        return os.path.join(self.pstats_dir, name)
+
+    def _forget_pstats(self, features_files):
+        """ Removes the profiles left by earlier runs of the features
+        about to run, so that only those of this run get merged
+        """
+        for filename in features_files:
+            try:
+                os.remove(self._pstats_filename(filename))
+            except OSError:
+                pass
+
+    def _merge_pstats(self, features_files):
+        """ Merges the profiles written for each feature, by this process
+        or by its workers, into `merged.pstats`
+        """
+        filenames = [self._pstats_filename(filename)
+                     for filename in features_files]
+        filenames = filter(os.path.exists, filenames)
+        if filenames:
+            stats = pstats.Stats(*filenames)
+            stats.dump_stats(os.path.join(self.pstats_dir, 'merged.pstats'))
+
+    def _add_result(self, total, feature_result, filename):
+        """ Hands the result of a feature to the `after.feature_result`
+        callbacks, then adds it to `total`, which in streaming mode
+        drops its steps
+        """
+        call_hook('result', 'feature', feature_result)
+        self._remember(feature_result, filename)
+        total.add_feature_result(feature_result)
+
+    def _remember(self, feature_result, filename):
+        """ Notes how long the feature of `feature_result` took, for
+        `order`, the files of the step definitions it used, with None
+        for undefined steps, for lettuce.watch, and the numbers of its
+        scenarios which did not pass, in the order of its feature file,
+        for `rerun_failed`. The scenarios which did not run keep the
+        state of the last time they ran.
+        """
+        feature = feature_result.feature
+        path = fs.FileSystem.abspath(filename)
+        if feature.duration is not None:
+            self.durations[path] = feature.duration
+
+        steps = list(feature.background and feature.background.steps or ())
+        for result in feature_result.scenario_results:
+            steps.extend(result.all_steps)
+        self.step_files[path] = set(
+            step.defined_at and step.defined_at.file for step in steps)
+
+        ran = set(result.scenario for result in feature_result.scenario_results)
+        failed = set(result.scenario for result in
+                     feature_result.scenario_results if not result.passed)
+        failed_before = self.failed_scenarios.pop(path, ())
+        numbers = [number for number, scenario in enumerate(feature.scenarios, 1)
+                   if scenario in failed or
+                   (scenario not in ran and number in failed_before)]
+        if numbers:
+            self.failed_scenarios[path] = numbers
+
+    def _schedule(self, features_files, last_run):
+        """ Orders `features_files` after the state left by the previous
+        runs. With the `failed-first` order the features which failed in
+        the last run go first; with `longest-first` the slowest ones do,
+        along with those which never ran, so that a pool of `processes`
+        does not end on a long feature. Ties keep their order.
+        """
+        if self.order == 'failed-first':
+            failed = last_run and last_run['failed'] or {}
+            key = lambda filename: fs.FileSystem.abspath(filename) not in failed
+        elif self.order == 'longest-first':
+            key = lambda filename: -self.durations.get(
+                fs.FileSystem.abspath(filename), float('inf'))
+        else:
+            raise ValueError('Unknown order: %r' % self.order)
+
+        return sorted(features_files, key=key)
+
+    def _run_in_processes(self, features_files, total):
+        """ Runs the features in a pool of `processes` forked workers,
+        which inherit the step definitions already loaded by this
+        process. Results and console output are collected in the
+        order of `features_files`, so they look like a serial run.
+
+        Returns whether the run failed, as `_report_failure` tells. A
+        feature which stopped the run drops the remaining features, as
+        in a serial run.
+        """
+        pool = multiprocessing.Pool(self.processes, _init_worker, (self,))
+        try:
+            results = pool.imap(_run_feature_in_worker, features_files)
+            for index, (stdout, stderr, result, failed) in enumerate(results):
+                sys.stdout.write(stdout)
+                sys.stderr.write(stderr)
+                if result is None:
+                    return failed
+
+                self._add_result(total, cPickle.loads(result),
+                                 features_files[index])
+        finally:
+            pool.terminate()
+            pool.join()
+
+        return False
+
+    def _report_failure(self):
+        """ Reports the exception which stopped the run, and returns
+        whether the run failed: an undefined step which escaped its
+        feature only stops it
+        """
+        e = sys.exc_info()[1]
+        if isinstance(e, exceptions.NoDefinitionFound):
+            sys.stderr.write("%s\n" % e)
+            return False
+
+        if isinstance(e, exceptions.LettuceSyntaxError):
+            sys.stderr.write(e.msg)
+        elif not self.failfast:
+            print "Died with %s" % str(e)
+            traceback.print_exc()
+        else:
+            print
+            print ("Lettuce aborted running any more tests "
+                   "because was called with the `--failfast` option")
+
+        return True
+
+
+_worker_runner = None
+
+
+def _init_worker(runner):
+    global _worker_runner
+    _worker_runner = runner
+
+
+def _run_feature_in_worker(filename):
+    """ Runs a single feature file within a worker process of
+    `Runner._run_in_processes`, returning what it printed along with
+    its pickled `FeatureResult`, or None and whether the run failed if
+    the feature stopped it
+    """
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = StringIO(), StringIO()
+    try:
+        try:
+            result = cPickle.dumps(_worker_runner._run_feature(filename),
+                                   cPickle.HIGHEST_PROTOCOL)
+            failed = False
+        except:
+            result = None
+            failed = True
+            try:
+                failed = _worker_runner._report_failure()
+            except:
+                traceback.print_exc()
+
+        return sys.stdout.getvalue(), sys.stderr.getvalue(), result, failed
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
@@ -20,6 +20,7 @@ import sys
 import optparse
 
 import lettuce
+from lettuce.watch import Watcher
 
 
 def main(args=sys.argv[1:]):
@@ -91,6 +92,20 @@ def main(args=sys.argv[1:]):
                       help='Write Subunit data to this file. Defaults to '
                       'subunit.bin')
 
+    parser.add_option("--subunit-chunk-size",
+                      dest="subunit_chunk_size",
+                      default=None,
+                      type="int",
+                      help='Send the output captured for Subunit in chunks '
+                      'of this many bytes. Defaults to 65536')
+
+    parser.add_option("--subunit-max-size",
+                      dest="subunit_max_size",
+                      default=None,
+                      type="int",
+                      help='Truncate the output captured for Subunit after '
+                      'this many bytes. Defaults to 16777216')
+
     parser.add_option("--failfast",
                       dest="failfast",
                       default=False,
@@ -103,6 +118,96 @@ def main(args=sys.argv[1:]):
                       action="store_true",
                       help='Launches an interactive debugger upon error')
 
+    parser.add_option("--processes",
+                      dest="processes",
+                      default=None,
+                      type="int",
+                      help='Run the features in this many worker processes')
+
+    parser.add_option("--feature-cache",
+                      dest="feature_cache",
+                      default=False,
+                      action="store_true",
+                      help='Cache parsed features under .lettuce_cache, '
+                      'so that unchanged feature files are not parsed again')
+
+    parser.add_option("--stream-results",
+                      dest="stream_results",
+                      default=False,
+                      action="store_true",
+                      help='Keep only a summary of each feature once it has '
+                      'run, which bounds the memory used by long runs')
+
+    parser.add_option("--profile",
+                      dest="profile",
+                      default=False,
+                      action="store_true",
+                      help='Report the slowest step definitions and hooks')
+
+    parser.add_option("--profile-file",
+                      dest="profile_filename",
+                      default=None,
+                      type="string",
+                      help='Write the profile as JSON to this file. Defaults '
+                      'to lettuce-profile.json')
+
+    parser.add_option("--non-tty",
+                      dest="non_tty",
+                      default=False,
+                      action="store_true",
+                      help='Print each step once it ran, instead of '
+                      'rewriting it in place, for output that goes to a log')
+
+    parser.add_option("--pstats-dir",
+                      dest="pstats_dir",
+                      default=None,
+                      type="string",
+                      help='Run each feature under cProfile and write its '
+                      'stats, and those of all features merged, to this '
+                      'directory')
+
+    parser.add_option("--rerun-failed",
+                      dest="rerun_failed",
+                      default=False,
+                      action="store_true",
+                      help='Run only the scenarios which failed the last '
+                      'time they ran, as recorded under .lettuce_cache')
+
+    parser.add_option("--order",
+                      dest="order",
+                      default=None,
+                      type="choice",
+                      choices=["failed-first", "longest-first"],
+                      help='Run the features which failed in the last run '
+                      'first (failed-first), or the slowest ones first '
+                      '(longest-first), after the history kept under '
+                      '.lettuce_cache')
+
+    parser.add_option("--exclude",
+                      dest="exclude",
+                      default=None,
+                      action="append",
+                      help='Do not look for features and steps in '
+                      'directories matching this pattern; can be used '
+                      'multiple times. Directories ignored by a .gitignore, '
+                      'node_modules and those of version control are '
+                      'always skipped')
+
+    parser.add_option("--watch",
+                      dest="watch",
+                      default=False,
+                      action="store_true",
+                      help='Keep running: whenever a feature file, or a '
+                      'step definitions module it uses, changes, run that '
+                      'feature again')
+
+    parser.add_option("--watch-interval",
+                      dest="watch_interval",
+                      default=1.0,
+                      type="float",
+                      help='How often, in seconds, --watch looks for '
+                      'changes. Defaults to 1')
+
     options, args = parser.parse_args(args)
     if args:
         base_path = os.path.abspath(args[0])
@@ -125,12 +230,31 @@ def main(args=sys.argv[1:]):
         xunit_filename=options.xunit_file,
         enable_subunit=options.enable_subunit,
         subunit_filename=options.subunit_filename,
+        subunit_chunk_size=options.subunit_chunk_size,
+        subunit_max_size=options.subunit_max_size,
         failfast=options.failfast,
         auto_pdb=options.auto_pdb,
         tags=tags,
         root_dir=options.root_dir,
+        processes=options.processes,
+        feature_cache=options.feature_cache,
+        stream_results=options.stream_results,
+        profile=options.profile,
+        profile_filename=options.profile_filename,
+        pstats_dir=options.pstats_dir,
+        non_tty=options.non_tty,
+        rerun_failed=options.rerun_failed,
+        order=options.order,
+        exclude=options.exclude,
     )
 
+    if options.watch:
+        try:
+            Watcher(runner, options.watch_interval).watch()
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+
     result = runner.run()
     failed = result is None or result.steps != result.steps_passed
     raise SystemExit(int(failed))
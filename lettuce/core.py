@@ -20,19 +20,19 @@ import re
 import codecs
 import unicodedata
 
-from copy import deepcopy
+from copy import copy
 from fuzzywuzzy import fuzz
-from itertools import chain
 from random import shuffle
 
 from lettuce import strings
+from lettuce import parser
 from lettuce import languages
 from lettuce.fs import FileSystem
 from lettuce.registry import STEP_REGISTRY
 from lettuce.registry import call_hook
+from lettuce.timing import clock
 from lettuce.exceptions import ReasonToFail
 from lettuce.exceptions import NoDefinitionFound
-from lettuce.exceptions import LettuceSyntaxError
 
 fs = FileSystem()
 
@@ -44,15 +44,52 @@ class REP(object):
     language = re.compile(u"\s*#\s*language:[ ]*([^\s]+)")
     within_double_quotes = re.compile(r'("[^"]+")')
     within_single_quotes = re.compile(r"('[^']+')")
-    only_whitespace = re.compile('^\s*$')
-    last_tag_extraction_regex = re.compile(ur'(?:\s|^)[@](\S+)\s*$')
-    first_tag_extraction_regex = re.compile(ur'^\s*[@](\S+)(?:\s|$)')
-    tag_strip_regex = re.compile(ur'(?:(?:^\s*|\s+)[@]\S+\s*)+$', re.DOTALL)
     comment_strip1 = re.compile(ur'(^[^\'"]*)[#]([^\'"]*)$')
     comment_strip2 = re.compile(ur'(^[^\'"]+)[#](.*)$')
 
 
+_placeholder_regexes = {}
+_described_files = {}
+
+
+def _described_file(filename):
+    """Returns the path of `filename` relative to the current dir. The
+    path is computed once per file and shared by all of its steps"""
+    key = (fs.current_dir(), filename)
+    path = _described_files.get(key)
+    if path is None:
+        path = _described_files[key] = fs.relpath(filename)
+
+    return path
+
+
+def _outline_evaluator(data):
+    """Returns a function that replaces, in a single pass, every
+    <placeholder> named after a key of the given outline row"""
+    if not data:
+        return lambda stuff: stuff
+
+    keys = frozenset(data)
+    regex = _placeholder_regexes.get(keys)
+    if regex is None:
+        names = sorted((unicode(k) for k in keys), key=len, reverse=True)
+        regex = _placeholder_regexes[keys] = re.compile(
+            u'<(%s)>' % u'|'.join(map(re.escape, names)), re.U)
+
+    values = dict((unicode(k), unicode(v)) for k, v in data.iteritems())
+    replace = lambda matched: values[matched.group(1)]
+
+    def evaluate(stuff):
+        if u'<' not in stuff:
+            return stuff
+
+        return regex.sub(replace, stuff)
+
+    return evaluate
+
+
 class HashList(list):
+    __slots__ = ('step',)
     __base_msg = 'The step "%s" have no table defined, so ' \
         'that you can\'t use step.hashes.%s'
 
@@ -150,14 +187,23 @@ class StepDefinition(object):
 
         return ret
 
+    def __getstate__(self):
+        # the user-defined callback is only needed to run the step, and
+        # there is no telling whether it can be pickled
+        state = self.__dict__.copy()
+        state['function'] = None
+        return state
+
 
 class StepDescription(object):
     """A simple object that holds filename and line number of a step
     description (step within feature file)"""
+    __slots__ = ('file', 'line')
+
     def __init__(self, line, filename):
         self.file = filename
         if self.file:
-            self.file = fs.relpath(self.file)
+            self.file = _described_file(self.file)
         else:
             self.file = "unknown file"
 
@@ -167,10 +213,13 @@ class StepDescription(object):
 class ScenarioDescription(object):
     """A simple object that holds filename and line number of a scenario
     description (scenario within feature file)"""
+    __slots__ = ('file', 'line')
 
-    def __init__(self, scenario, filename, string, language):
-        self.file = fs.relpath(filename)
-        self.line = None
+    def __init__(self, scenario, filename, string, language, line=None):
+        self.file = _described_file(filename)
+        self.line = line
+        if line is not None:
+            return
 
         for pline, part in enumerate(string.splitlines()):
             part = part.strip()
@@ -184,11 +233,17 @@ class ScenarioDescription(object):
 class FeatureDescription(object):
     """A simple object that holds filename and line number of a feature
     description"""
+    __slots__ = ('file', 'line', 'description_at')
+
+    def __init__(self, feature, filename, string, language,
+                 line=None, description_at=None):
+        self.file = _described_file(filename)
+        self.line = line
+        if line is not None:
+            self.description_at = tuple(description_at or ())
+            return
 
-    def __init__(self, feature, filename, string, language):
         lines = [l.strip() for l in string.splitlines()]
-        self.file = fs.relpath(filename)
-        self.line = None
         described_at = []
         description_lines = strings.get_stripped_lines(feature.description)
 
@@ -207,6 +262,12 @@ class FeatureDescription(object):
 
 class Step(object):
     """ Object that represents each step on feature files."""
+    # what every step holds is slotted; what plugins and runs attach to
+    # a step still goes to its __dict__
+    __slots__ = ('sentence', 'original_sentence', 'keys', 'non_unique_keys',
+                 'hashes', 'multiline', 'columns', 'described_at',
+                 'scenario', 'background', '__dict__', '__weakref__')
+
     has_definition = False
     indentation = 4
     table_indentation = indentation + 2
@@ -216,23 +277,32 @@ class Step(object):
     passed = None
     failed = None
     related_outline = None
-    scenario = None
-    background = None
     display = True
-    columns = None
     matrix = None
+    duration = None
 
     def __init__(self, sentence, remaining_lines, line=None, filename=None):
         self.sentence = sentence
         self.original_sentence = sentence
-        self._remaining_lines = remaining_lines
-        keys, hashes, self.multiline, columns, nukeys = self._parse_remaining_lines(remaining_lines)
+        if remaining_lines:
+            keys, hashes, self.multiline, columns, nukeys = self._parse_remaining_lines(remaining_lines)
+        else:
+            keys, hashes, self.multiline, columns, nukeys = (), (), u'', [], []
         self.keys = tuple(keys)
         self.non_unique_keys = nukeys
         self.hashes = HashList(self, hashes)
         self.columns = columns
         self.described_at = StepDescription(line, filename)
-        self.proposed_method_name, self.proposed_sentence = self.propose_definition()
+        self.scenario = None
+        self.background = None
+
+    @property
+    def proposed_method_name(self):
+        return self.propose_definition()[0]
+
+    @property
+    def proposed_sentence(self):
+        return self.propose_definition()[1]
 
     def propose_definition(self):
         sentence = unicode(self.original_sentence)
@@ -262,35 +332,25 @@ class Step(object):
         return method_name, sentence
 
     def solve_and_clone(self, data, display_step):
-        sentence = self.sentence
-        multiline = self.multiline
-        hashes = self.hashes[:]  # deep copy
-        for k, v in data.items():
-
-            def evaluate(stuff):
-                return stuff.replace(u'<%s>' % unicode(k), unicode(v))
-
-            def evaluate_hash_value(hash_row):
-                new_row = {}
-                for rkey, rvalue in hash_row.items():
-                    new_row[rkey] = evaluate(rvalue)
-                return new_row
-
-            sentence = evaluate(sentence)
-            multiline = evaluate(multiline)
-            hashes = map(evaluate_hash_value, hashes)
-
-        new = deepcopy(self)
-        new.sentence = sentence
-        new.multiline = multiline
-        new.hashes = hashes
+        """Returns a copy of this step with the <placeholders> of an
+        outline row replaced. The copy is shallow: everything but the
+        sentence, the multiline and the hashes is shared with this step.
+        The rows of the hashes are always copied, as step definitions
+        may change them."""
+        evaluate = _outline_evaluator(data)
+
+        new = copy(self)
+        new.sentence = evaluate(self.sentence)
+        new.multiline = evaluate(self.multiline)
+        new.hashes = HashList(new, [
+            dict((k, evaluate(v)) for k, v in row.iteritems())
+            for row in self.hashes])
         new.display = display_step
         return new
 
     def _calc_list_length(self, lst):
-        length = self.table_indentation + 2
-        for item in lst:
-            length += strings.column_width(item) + 2
+        length = self.table_indentation + 2 + 2 * len(lst)
+        length += sum(strings.column_widths(lst))
 
         if len(lst) > 1:
             length += 1
@@ -356,14 +416,8 @@ class Step(object):
 
 
     def _get_match(self, ignore_case):
-        matched, func = None, lambda: None
-        for step, func in STEP_REGISTRY.items():
-            regex = STEP_REGISTRY.get_regex(step, ignore_case)
-            matched = regex.search(self.sentence)
-            if matched:
-                break
-
-        return matched, StepDefinition(self, func)
+        matched, func = STEP_REGISTRY.match(self.sentence, ignore_case)
+        return matched, StepDefinition(self, func or (lambda: None))
 
     def pre_run(self, ignore_case, with_outline=None):
         matched, step_definition = self._get_match(ignore_case)
@@ -467,6 +521,7 @@ class Step(object):
             if outline:
                 step = step.solve_and_clone(outline, display_steps)
 
+            started = None
             try:
                 step.pre_run(ignore_case, with_outline=outline)
 
@@ -475,6 +530,7 @@ class Step(object):
 
                 call_hook('before_output', 'step', step)
 
+                started = clock()
                 if not steps_failed and not steps_undefined:
                     step.run(ignore_case)
                     steps_passed.append(step)
@@ -489,6 +545,9 @@ class Step(object):
                     raise
 
             finally:
+                if started is not None:
+                    step.duration = clock() - started
+
                 all_steps.append(step)
 
                 call_hook('after_output', 'step', step)
@@ -499,45 +558,29 @@ class Step(object):
         return (all_steps, steps_passed, steps_failed, steps_undefined)
 
     @classmethod
-    def many_from_lines(klass, lines, filename=None, original_string=None):
+    def many_from_lines(klass, lines, filename=None):
         """Parses a set of steps from lines of input.
 
         This will correctly parse and produce a list of steps from lines without
         any Scenario: heading at the top. Examples in table form are correctly
-        parsed, but must be well-formed under a regular step sentence.
+        parsed, but must be well-formed under a regular step sentence. Tags
+        are ignored, and line numbers are counted from the first line.
 
         """
-        invalid_first_line_error = '\nFirst line of step "%s" is in %s form.'
-        if lines and strings.wise_startswith(lines[0], u'|'):
-            raise LettuceSyntaxError(
-                None,
-                invalid_first_line_error % (lines[0], 'table'))
-
-        if lines and strings.wise_startswith(lines[0], u'"""'):
-            raise LettuceSyntaxError(
-                None,
-                invalid_first_line_error % (lines[0], 'multiline'))
-
-        # Select only lines that aren't end-to-end whitespace and aren't tags
-        # Tags could be included as steps if the first scenario following a background is tagged
-        # This then causes the test to fail, because lettuce looks for the step's definition (which doesn't exist)
-        lines = filter(lambda x: not (REP.only_whitespace.match(x) or re.match(r'^\s*@', x)), lines)
-
-        step_strings = []
-        in_multiline = False
-        for line in lines:
-            if strings.wise_startswith(line, u'"""'):
-                in_multiline = not in_multiline
-                step_strings[-1] += "\n%s" % line
-            elif strings.wise_startswith(line, u"|") or in_multiline:
-                step_strings[-1] += "\n%s" % line
-            elif '#' in line:
-                step_strings.append(klass._handle_inline_comments(line))
-            else:
-                step_strings.append(line)
+        return [klass.from_node(node, filename)
+                for node in parser.parse_steps(lines)]
+
+    @classmethod
+    def from_node(cls, node, with_file=None):
+        """Creates a new step from a lettuce.parser.StepNode"""
+        sentence = node.sentence
+        if '#' in sentence:
+            sentence = cls._handle_inline_comments(sentence).strip()
 
-        mkargs = lambda s: [s, filename, original_string]
-        return [klass.from_string(*mkargs(s)) for s in step_strings]
+        return cls(sentence,
+                   remaining_lines=node.lines,
+                   line=node.line,
+                   filename=with_file)
 
     @classmethod
     def from_string(cls, string, with_file=None, original_string=None):
@@ -558,17 +601,30 @@ class Step(object):
                    filename=with_file)
 
 
+def _steps_from(lines, with_file=None):
+    """Returns the steps of `lines`, which are either the lines of the
+    steps or the Step objects already parsed from them"""
+    if lines and isinstance(lines[0], basestring):
+        return Step.many_from_lines(lines, with_file)
+
+    return list(lines)
+
+
 class Scenario(object):
     """ Object that represents each scenario on feature files."""
     described_at = None
     indentation = 2
     table_indentation = indentation + 2
+    duration = None
+    outline_duration = None
+    _max_length = None
 
     def __init__(self, name, remaining_lines, keys, outlines,
                  with_file=None,
                  original_string=None,
                  language=None,
-                 tags=None):
+                 tags=None,
+                 line=None):
 
         self.feature = None
         if not language:
@@ -578,9 +634,7 @@ class Scenario(object):
         self.language = language
         self.tags = tags
         self.remaining_lines = remaining_lines
-        self.steps = self._parse_remaining_lines(remaining_lines,
-                                                 with_file,
-                                                 original_string)
+        self.steps = _steps_from(remaining_lines, with_file)
         self.keys = keys
         self.outlines = outlines
         self.with_file = with_file
@@ -589,15 +643,23 @@ class Scenario(object):
         if with_file and original_string:
             scenario_definition = ScenarioDescription(self, with_file,
                                                       original_string,
-                                                      language)
+                                                      language,
+                                                      line=line)
             self._set_definition(scenario_definition)
 
-        self.solved_steps = list(self._resolve_steps(
-            self.steps, self.outlines, with_file, original_string))
         self._add_myself_to_steps()
 
     @property
     def max_length(self):
+        """The width of the widest line of this scenario. It is computed
+        once, and again only when steps or outline rows are added"""
+        key = len(self.steps), len(self.outlines)
+        if self._max_length is None or self._max_length[0] != key:
+            self._max_length = key, self._calc_max_length()
+
+        return self._max_length[1]
+
+    def _calc_max_length(self):
         if self.outlines:
             prefix = self.language.first_of_scenario_outline + ":"
         else:
@@ -718,11 +780,14 @@ class Scenario(object):
 
         results = []
         call_hook('before_each', 'scenario', self)
+        scenario_started = clock()
 
         def run_scenario(almost_self, order=-1, outline=None, run_callbacks=False):
+            started = None
             try:
                 if outline:
                     self._report_outline_hook(outline, True)
+                started = clock()
                 if self.background:
                     self.background.run(ignore_case)
 
@@ -732,10 +797,13 @@ class Scenario(object):
                 if outline:
                     # Can't use "finally" here since we need to call it before after_each_scenario
                     self._report_outline_hook(outline, False)
+                self.duration = clock() - scenario_started
                 call_hook('after_each', 'scenario', self)
                 raise
             finally:
+                duration = started is not None and clock() - started or 0.0
                 if outline:
+                    self.outline_duration = duration
                     call_hook('outline', 'scenario', self, order, outline,
                             reasons_to_fail)
             if outline:
@@ -751,7 +819,8 @@ class Scenario(object):
                 steps_failed,
                 steps_skipped,
                 steps_undefined,
-                outline
+                outline,
+                duration
             )
 
         if self.outlines:
@@ -760,6 +829,7 @@ class Scenario(object):
         else:
             results.append(run_scenario(self, run_callbacks=True))
 
+        self.duration = clock() - scenario_started
         call_hook('after_each', 'scenario', self)
         return results
 
@@ -767,9 +837,6 @@ class Scenario(object):
         for step in self.steps:
             step.scenario = self
 
-        for step in self.solved_steps:
-            step.scenario = self
-
     def _report_outline_hook(self, outline, started):
         """
         Function called before each outline and after each outline to provide hooks
@@ -781,21 +848,18 @@ class Scenario(object):
         call_hook('before_each' if started else 'after_each', 'outline', self, outline)
 
 
-    def _resolve_steps(self, steps, outlines, with_file, original_string):
+    def _resolve_steps(self, steps, outlines):
         for outline_idx, outline in enumerate(outlines):
             for step in steps:
                 yield step.solve_and_clone(outline, display_step=(outline_idx == 0))
 
-    def _parse_remaining_lines(self, lines, with_file, original_string):
-        invalid_first_line_error = '\nInvalid step on scenario "%s".\n' \
-            'Maybe you killed the first step text of that scenario\n'
-
-        if lines and strings.wise_startswith(lines[0], u'|'):
-            raise LettuceSyntaxError(
-                with_file,
-                invalid_first_line_error % self.name)
-
-        return Step.many_from_lines(lines, with_file, original_string)
+    @property
+    def solved_steps(self):
+        """The steps of every outline row, with their placeholders
+        replaced. They are built on each access, so that outlines which
+        never run never pay for them: running a scenario solves one row
+        at a time"""
+        return list(self._resolve_steps(self.steps, self.outlines))
 
     def _set_definition(self, definition):
         self.described_at = definition
@@ -840,39 +904,38 @@ class Scenario(object):
                     language=None,
                     tags=None):
         """ Creates a new scenario from string"""
-        # ignoring comments
-        string = "\n".join(strings.get_stripped_lines(string, ignore_lines_starting_with='#'))
-
         if not language:
             language = Language()
 
-        splitted = strings.split_wisely(string, u"(%s):" % language.examples, True)
-        string = splitted[0]
-        keys = []
-        outlines = []
-        if len(splitted) > 1:
-            parts = [l for l in splitted[1:] if l not in language.examples]
-            part = "".join(parts)
-            keys, outlines = strings.parse_hashes(strings.get_stripped_lines(part))
-
-        lines = strings.get_stripped_lines(string)
-
-        scenario_line = lines.pop(0).strip()
-
-        for repl in (language.scenario_outline, language.scenario):
-            scenario_line = strings.remove_it(scenario_line, u"(%s): " % repl).strip()
-
+        node = parser.parse_scenario(string.splitlines(), language, with_file)
+        return new_scenario.from_node(
+            node,
+            with_file=with_file,
+            original_string=original_string,
+            language=language,
+            tags=tags,
+        )
 
+    @classmethod
+    def from_node(new_scenario, node,
+                  with_file=None,
+                  original_string=None,
+                  language=None,
+                  tags=None):
+        """Creates a new scenario from a lettuce.parser.ScenarioNode"""
+        keys, outlines = strings.parse_hashes(node.examples)
+        steps = [Step.from_node(step, with_file) for step in node.steps]
 
         scenario = new_scenario(
-            name=scenario_line,
-            remaining_lines=lines,
+            name=node.name,
+            remaining_lines=steps,
             keys=keys,
             outlines=outlines,
             with_file=with_file,
             original_string=original_string,
             language=language,
             tags=tags,
+            line=node.line,
         )
 
         return scenario
@@ -880,13 +943,15 @@ class Scenario(object):
 
 class Background(object):
     indentation = 2
+    duration = None
+    _max_length = None
 
     def __init__(self, lines, feature,
                  with_file=None,
                  original_string=None,
                  language=None):
-        self.steps = map(self.add_self_to_step, Step.many_from_lines(
-            lines, with_file, original_string))
+        self.steps = map(self.add_self_to_step,
+                         _steps_from(lines, with_file))
 
         self.feature = feature
         self.original_string = original_string
@@ -898,19 +963,23 @@ class Background(object):
 
     def run(self, ignore_case):
         call_hook('before_each', 'background', self)
+        started = clock()
         results = []
 
         for step in self.steps:
             matched, step_definition = step.pre_run(ignore_case)
             call_hook('before_each', 'step', step)
+            step_started = clock()
             try:
                 results.append(step.run(ignore_case))
             except Exception as e:
                 print e
                 pass
+            step.duration = clock() - step_started
 
             call_hook('after_each', 'step', step)
 
+        self.duration = clock() - started
         call_hook('after_each', 'background', self, results)
         return results
 
@@ -919,12 +988,12 @@ class Background(object):
 
     @property
     def max_length(self):
-        max_length = 0
-        for step in self.steps:
-            if step.max_length > max_length:
-                max_length = step.max_length
+        key = len(self.steps)
+        if self._max_length is None or self._max_length[0] != key:
+            self._max_length = key, max(
+                [0] + [step.max_length for step in self.steps])
 
-        return max_length
+        return self._max_length[1]
 
     def represented(self):
         return ((' ' * self.indentation) + 'Background:')
@@ -947,9 +1016,14 @@ class Background(object):
 class Feature(object):
     """ Object that represents a feature."""
     described_at = None
+    duration = None
+    _max_length = None
 
     def __init__(self, name, remaining_lines, with_file, original_string,
                  language=None):
+        """`remaining_lines` are the lines of the feature, from its tags
+        or its heading on, or the lettuce.parser.FeatureNode already
+        parsed from them"""
 
         if not language:
             language = language()
@@ -958,29 +1032,52 @@ class Feature(object):
         self.language = language
         self.original_string = original_string
 
-        (self.background,
-         self.scenarios,
-         self.description) = self._parse_remaining_lines(
-            remaining_lines,
-            original_string,
-            with_file)
+        node = remaining_lines
+        if not isinstance(node, parser.FeatureNode):
+            node = parser.parse_feature(remaining_lines, language, with_file)
+
+        self.description = u"\n".join(node.description)
+        self.tags = node.tags or None
+
+        self.background = None
+        if node.background:
+            self.background = Background(
+                [Step.from_node(step, with_file) for step in node.background],
+                self,
+                with_file=with_file,
+                original_string=original_string,
+                language=language)
+
+        self.scenarios = [
+            Scenario.from_node(scenario,
+                               with_file=with_file,
+                               original_string=original_string,
+                               language=language,
+                               tags=scenario.tags)
+            for scenario in node.scenarios]
 
         if with_file:
-            feature_definition = FeatureDescription(self,
-                                                    with_file,
-                                                    original_string,
-                                                    language)
+            feature_definition = FeatureDescription(
+                self, with_file, original_string, language,
+                line=node.line, description_at=node.description_at)
             self._set_definition(feature_definition)
 
-        if original_string and '@' in self.original_string:
-            self.tags = self._find_tags_in(original_string)
-        else:
-            self.tags = None
-
         self._add_myself_to_scenarios()
 
     @property
     def max_length(self):
+        """The width of the widest line of this feature, which aligns
+        the location of every line printed. It is computed once, and
+        again only when scenarios, steps or outline rows are added"""
+        key = (len(self.scenarios),
+               sum(len(scenario.steps) + len(scenario.outlines)
+                   for scenario in self.scenarios))
+        if self._max_length is None or self._max_length[0] != key:
+            self._max_length = key, self._calc_max_length()
+
+        return self._max_length[1]
+
+    def _calc_max_length(self):
         max_length = strings.column_width(u"%s: %s" % (
             self.language.first_of_feature, self.name))
 
@@ -1003,36 +1100,10 @@ class Feature(object):
     def _add_myself_to_scenarios(self):
         for scenario in self.scenarios:
             scenario.feature = self
+            scenario.background = self.background
             if scenario.tags is not None and self.tags:
                 scenario.tags.extend(self.tags)
 
-    def _find_tags_in(self, original_string):
-        broad_regex = re.compile(ur"([@].*)%s: (%s)" % (
-            self.language.feature,
-            re.escape(self.name)), re.DOTALL)
-
-        regexes = [broad_regex]
-
-        def try_finding_with(regex):
-            found = regex.search(original_string)
-
-            if found:
-                tag_lines = found.group().splitlines()
-                tags = list(chain(*map(self._extract_tag, tag_lines)))
-                return tags
-
-        for regex in regexes:
-            found = try_finding_with(regex)
-            if found:
-                return found
-
-        return []
-
-    def _extract_tag(self, item):
-        regex = re.compile(r'(?:(?:^|\s+)[@]([^@\s]+))')
-        found = regex.findall(item)
-        return found
-
     def __unicode__(self):
         return u'<%s: "%s">' % (self.language.first_of_feature, self.name)
 
@@ -1059,163 +1130,69 @@ class Feature(object):
     @classmethod
     def from_string(new_feature, string, with_file=None, language=None):
         """Creates a new feature from string"""
-
-        lines = strings.get_stripped_lines(
-            string,
-            ignore_lines_starting_with='#',
-        )
         if not language:
             language = Language()
 
-        found = len(re.findall(r'^[ \t]*(?:%s):[ ]*\w+' % language.feature, "\n".join(lines), re.U + re.M))
-
-        if found > 1:
-            raise LettuceSyntaxError(with_file,
-                'A feature file must contain ONLY ONE feature!')
-
-        elif found == 0:
-            raise LettuceSyntaxError(with_file,
-                'Features must have a name. e.g: "Feature: This is my name"')
-
-        while lines:
-            matched = re.search(r'^[ \t]*(?:%s):(.*)' % language.feature, lines[0], re.I)
-            if matched:
-                name = matched.groups()[0].strip()
-                break
-
-            lines.pop(0)
-
-        feature = new_feature(name=name,
-                              remaining_lines=lines,
-                              with_file=with_file,
-                              original_string=string,
-                              language=language)
-        return feature
+        node = parser.parse_feature(string.splitlines(), language, with_file)
+        return new_feature(name=node.name,
+                           remaining_lines=node,
+                           with_file=with_file,
+                           original_string=string,
+                           language=language)
 
     @classmethod
-    def from_file(new_feature, filename):
-        """Creates a new feature from filename"""
+    def from_file(new_feature, filename, cache=None):
+        """Creates a new feature from filename. If a
+        `lettuce.fs.FeatureCache` is given, the feature is loaded from
+        it when the file has not changed since it was last parsed"""
         f = codecs.open(filename, "r", "utf-8")
         string = f.read()
         f.close()
-        language = Language.guess_from_string(string)
-        feature = new_feature.from_string(string, with_file=filename, language=language)
-        return feature
-
-    def _set_definition(self, definition):
-        self.described_at = definition
-
-    def _extract_tags(self, string, extract_regex=REP.last_tag_extraction_regex):
-        tags = []
-        while True:
-            m = extract_regex.search(string)
-            if not m:
-                return tags, string
-            tags.insert(0, m.groups()[0])
-            string = extract_regex.sub('', string)
 
-    def _strip_next_scenario_tags(self, string):
-        stripped = REP.tag_strip_regex.sub('', string)
-        return stripped
-
-    def _extract_desc_and_bg(self, joined):
-        if not re.search(self.language.background, joined):
-            return joined, None
-
-        parts = strings.split_wisely(
-            joined, "(%s):\s*" % self.language.background)
-
-        description = parts.pop(0)
-
-        if not re.search(self.language.background, description):
-            if parts:
-                parts = parts[1:]
-        else:
-            description = ""
-
-        background_string = "".join(parts).splitlines()
-        return description, background_string
-
-    def _check_scenario_syntax(self, lines, filename):
-        empty_scenario = ('%s:' % (self.language.first_of_scenario)).lower()
-        for line in lines:
-            if line.lower() == empty_scenario:
-                raise LettuceSyntaxError(
-                    filename,
-                    ('In the feature "%s", scenarios '
-                     'must have a name, make sure to declare a scenario like '
-                     'this: `Scenario: name of your scenario`' % self.name),
-                )
-
-    def _parse_remaining_lines(self, lines, original_string, with_file=None):
-        joined = u"\n".join(lines[1:])
-
-        self._check_scenario_syntax(lines, filename=with_file)
-        # replacing occurrences of Scenario Outline, with just "Scenario"
-        scenario_prefix = u'%s:' % self.language.first_of_scenario
-        regex = re.compile(
-            ur"%s:[\t\r\f\v]*" % self.language.scenario_separator, re.U | re.I | re.DOTALL)
-
-        joined = regex.sub(scenario_prefix, joined)
-
-        parts = strings.split_wisely(joined, scenario_prefix)
-
-        description = u""
-        background = None
-        tags_scenario = []
-
-        if not re.search("^" + scenario_prefix, joined):
-            if not parts:
-                raise LettuceSyntaxError(
-                    with_file,
-                    (u"Features must have scenarios.\n"
-                     "Please refer to the documentation available at http://lettuce.it for more information.")
-                )
-            tags_scenario, description_and_background = self._extract_tags(parts[0])
-            description, background_lines = self._extract_desc_and_bg(description_and_background)
-
-            background = background_lines and Background.from_string(
-                background_lines,
-                self,
-                with_file=with_file,
-                original_string=original_string,
-                language=self.language,
-            ) or None
-            parts.pop(0)
+        if cache is not None:
+            feature = cache.load(filename, string)
+            if isinstance(feature, new_feature):
+                feature._describe_in(filename)
+                return feature
 
-        prefix = self.language.first_of_scenario
+        language = Language.guess_from_string(string)
+        feature = new_feature.from_string(string, with_file=filename, language=language)
 
-        upcoming_scenarios = [
-            u"%s: %s" % (prefix, s) for s in parts if s.strip()]
+        if cache is not None:
+            cache.store(filename, string, feature)
 
-        kw = dict(
-            original_string=original_string,
-            with_file=with_file,
-            language=self.language,
-        )
+        return feature
 
-        scenarios = []
-        while upcoming_scenarios:
-            tags_next_scenario, current = self._extract_tags(upcoming_scenarios[0])
-            current = self._strip_next_scenario_tags(upcoming_scenarios.pop(0))
+    def _describe_in(self, filename):
+        """Describes the feature, its scenarios and their steps as found
+        in `filename`, relative to the current dir, which is not the one
+        a feature loaded from a cache was parsed in"""
+        path = _described_file(filename)
+        descriptions = [self.described_at]
+        if self.background:
+            descriptions.extend(step.described_at
+                                for step in self.background.steps)
 
-            params = dict(
-                tags=tags_scenario,
-            )
+        for scenario in self.scenarios:
+            scenario.with_file = filename
+            descriptions.append(scenario.described_at)
+            descriptions.extend(step.described_at for step in scenario.steps)
 
-            params.update(kw)
-            current_scenario = Scenario.from_string(current, **params)
-            current_scenario.background = background
-            scenarios.append(current_scenario)
-            tags_scenario = tags_next_scenario
+        for description in descriptions:
+            if description is not None:
+                description.file = path
 
-        return background, scenarios, description
+    def _set_definition(self, definition):
+        self.described_at = definition
 
     def run(self, scenarios=None, ignore_case=True, tags=None, random=False, failfast=False):
         scenarios_ran = []
 
+        # scenarios are numbered in the order of the feature file, even
+        # when they run in a random one
+        numbered_scenarios = list(enumerate(self.scenarios, start=1))
         if random:
-            shuffle(self.scenarios)
+            shuffle(numbered_scenarios)
 
         scenario_nums_to_run = None
         if isinstance(scenarios, (tuple, list)):
@@ -1225,20 +1202,23 @@ class Feature(object):
         def should_run_scenario(num, scenario):
             return scenario.matches_tags(tags) and \
                    (scenario_nums_to_run is None or num in scenario_nums_to_run)
-        scenarios_to_run = [scenario for num, scenario in enumerate(self.scenarios, start=1)
+        scenarios_to_run = [scenario for num, scenario in numbered_scenarios
                                      if should_run_scenario(num, scenario)]
         # If no scenarios in this feature will run, don't run the feature hooks.
         if not scenarios_to_run:
             return FeatureResult(self)
 
         call_hook('before_each', 'feature', self)
+        started = clock()
         try:
             for scenario in scenarios_to_run:
                 scenarios_ran.extend(scenario.run(ignore_case, failfast=failfast))
         except:
+            self.duration = clock() - started
             call_hook('after_each', 'feature', self)
             raise
         else:
+            self.duration = clock() - started
             call_hook('after_each', 'feature', self)
             return FeatureResult(self, *scenarios_ran)
 
@@ -1254,10 +1234,49 @@ class FeatureResult(object):
         return all([result.passed for result in self.scenario_results])
 
 
+class FeatureResultSummary(object):
+    """What a streaming TotalResult keeps of a FeatureResult: whether
+    the feature and each of its scenarios passed, but no steps"""
+    __slots__ = ('feature_name', 'passed', 'scenario_results')
+
+    def __init__(self, feature_result):
+        self.feature_name = feature_result.feature.name
+        self.passed = feature_result.passed
+        self.scenario_results = tuple(
+            ScenarioResultSummary(result)
+            for result in feature_result.scenario_results)
+
+
+class ScenarioResultSummary(object):
+    """What a streaming TotalResult keeps of a ScenarioResult"""
+    __slots__ = ('scenario_name', 'outline', 'passed', 'total_steps')
+
+    def __init__(self, scenario_result):
+        self.scenario_name = scenario_result.scenario.name
+        self.outline = scenario_result.outline
+        self.passed = scenario_result.passed
+        self.total_steps = scenario_result.total_steps
+
+
+class ProposedDefinition(object):
+    """What a streaming TotalResult keeps of an undefined step: enough
+    to propose a step definition for it"""
+    __slots__ = ('sentence', 'proposed_sentence', 'proposed_method_name')
+
+    def __init__(self, step):
+        self.sentence = step.sentence
+        self.proposed_sentence = step.proposed_sentence
+        self.proposed_method_name = step.proposed_method_name
+
+
 class ScenarioResult(object):
     """Object that holds results of each step ran from within a scenario"""
+    __slots__ = ('scenario', 'all_steps', 'steps_passed', 'steps_failed',
+                 'steps_skipped', 'steps_undefined', 'outline', 'total_steps',
+                 'duration')
+
     def __init__(self, scenario, all_steps, steps_passed, steps_failed, steps_skipped,
-                 steps_undefined, outline=None):
+                 steps_undefined, outline=None, duration=None):
 
         self.scenario = scenario
 
@@ -1267,6 +1286,7 @@ class ScenarioResult(object):
         self.steps_skipped = steps_skipped
         self.steps_undefined = steps_undefined
         self.outline = outline
+        self.duration = duration
 
         self.total_steps = len(all_steps)
 
@@ -1277,14 +1297,19 @@ class ScenarioResult(object):
 
 class TotalResult(object):
 
-    def __init__(self, feature_results=None):
+    def __init__(self, feature_results=None, streaming=False):
         self.feature_results = feature_results
+        self.streaming = streaming
+        self.duration = None
+        # how long the step definitions took to load, see FeatureLoader
+        self.discovery = None
         self.scenario_results = []
         self.steps_passed = 0
         self.steps_failed = 0
         self.steps_skipped = 0
         self.steps_undefined = 0
         self._proposed_definitions = []
+        self._proposed_sentences = set()
         self.steps = 0
         # store the scenario names that failed, with their location
         self.failed_scenario_locations = []
@@ -1293,14 +1318,47 @@ class TotalResult(object):
         for feature_result in self.feature_results:
             for scenario_result in feature_result.scenario_results:
                 self.scenario_results.append(scenario_result)
-                self.steps_passed += len(scenario_result.steps_passed)
-                self.steps_failed += len(scenario_result.steps_failed)
-                self.steps_skipped += len(scenario_result.steps_skipped)
-                self.steps_undefined += len(scenario_result.steps_undefined)
-                self.steps += scenario_result.total_steps
-                self._proposed_definitions.extend(scenario_result.steps_undefined)
-                if len(scenario_result.steps_failed) > 0:
-                    self.failed_scenario_locations.append(scenario_result.scenario.represented())
+                self._count(scenario_result)
+
+    def add_feature_result(self, feature_result):
+        """Aggregates the result of a feature as soon as it has run.
+
+        In streaming mode only a FeatureResultSummary is kept, so the
+        steps of the feature can be released once the reporters, which
+        follow the run through hooks, are done with them.
+        """
+        if self.feature_results is None:
+            self.feature_results = []
+
+        for scenario_result in feature_result.scenario_results:
+            self._count(scenario_result)
+
+        if self.streaming:
+            feature_result = FeatureResultSummary(feature_result)
+
+        self.feature_results.append(feature_result)
+        self.scenario_results.extend(feature_result.scenario_results)
+
+    def _count(self, scenario_result):
+        self.steps_passed += len(scenario_result.steps_passed)
+        self.steps_failed += len(scenario_result.steps_failed)
+        self.steps_skipped += len(scenario_result.steps_skipped)
+        self.steps_undefined += len(scenario_result.steps_undefined)
+        self.steps += scenario_result.total_steps
+
+        if self.streaming:
+            self._propose_definitions(scenario_result.steps_undefined)
+        else:
+            self._proposed_definitions.extend(scenario_result.steps_undefined)
+
+        if len(scenario_result.steps_failed) > 0:
+            self.failed_scenario_locations.append(scenario_result.scenario.represented())
+
+    def _propose_definitions(self, steps):
+        for step in steps:
+            if step.proposed_sentence not in self._proposed_sentences:
+                self._proposed_sentences.add(step.proposed_sentence)
+                self._proposed_definitions.append(ProposedDefinition(step))
 
     def _filter_proposed_definitions(self):
         sentences = []
@@ -1364,17 +1422,16 @@ class SummaryTotalResults(TotalResult):
 
         """
         for partial_result in filter(None, self.total_results):
-            self.features_ran_overall += len(partial_result.feature_results)
-            self.features_passed_overall += len([feat for feat in partial_result.feature_results if feat.passed])
+            self.features_ran_overall += partial_result.features_ran
+            self.features_passed_overall += partial_result.features_passed
             self.feature_results = partial_result.feature_results
-            for feature_result in self.feature_results:
-                for scenario_result in feature_result.scenario_results:
-                    self.scenario_results.append(scenario_result)
-                    self.steps_passed += len(scenario_result.steps_passed)
-                    self.steps_failed += len(scenario_result.steps_failed)
-                    self.steps_skipped += len(scenario_result.steps_skipped)
-                    self.steps_undefined += len(scenario_result.steps_undefined)
-                    self.steps += scenario_result.total_steps
-                    self._proposed_definitions.extend(scenario_result.steps_undefined)
-                    if len(scenario_result.steps_failed) > 0:
-                        self.failed_scenario_locations.append(scenario_result.scenario.represented())
+            self.scenario_results.extend(partial_result.scenario_results)
+            self.steps_passed += partial_result.steps_passed
+            self.steps_failed += partial_result.steps_failed
+            self.steps_skipped += partial_result.steps_skipped
+            self.steps_undefined += partial_result.steps_undefined
+            self.steps += partial_result.steps
+            self._proposed_definitions.extend(
+                partial_result._proposed_definitions)
+            self.failed_scenario_locations.extend(
+                partial_result.failed_scenario_locations)
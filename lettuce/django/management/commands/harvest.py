@@ -108,6 +108,18 @@ class Command(BaseCommand):
             '--subunit-file', action='store', dest='subunit_file', default=None,
             help='Write Subunit to this file. Defaults to subunit.bin'
         )
+        parser.add_argument(
+            '--subunit-chunk-size', action='store', dest='subunit_chunk_size',
+            default=None, type=int,
+            help='Send the output captured for Subunit in chunks of this many '
+            'bytes. Defaults to 65536'
+        )
+        parser.add_argument(
+            '--subunit-max-size', action='store', dest='subunit_max_size',
+            default=None, type=int,
+            help='Truncate the output captured for Subunit after this many '
+            'bytes. Defaults to 16777216'
+        )
         parser.add_argument(
             '--with-jsonreport', action='store_true', dest='enable_jsonreport',
             default=False, help='Output JSON test results to a file'
@@ -116,6 +128,13 @@ class Command(BaseCommand):
             '--jsonreport-file', action='store', dest='jsonreport_file',
             default=None, help='Write JSON report to this file. Defaults to lettucetests.json'
         )
+        parser.add_argument(
+            '--jsonreport-lines', action='store_true', dest='jsonreport_lines',
+            default=False,
+            help='Write the JSON report as JSON Lines, one record per step, '
+            'scenario and feature as soon as it has run. Defaults to '
+            'lettucetests.jsonl'
+        )
         parser.add_argument(
             "--failfast", dest="failfast", default=False,
             action="store_true", help='Stop running in the first failure'
@@ -124,6 +143,61 @@ class Command(BaseCommand):
             "--pdb", dest="auto_pdb", default=False, action="store_true",
             help='Launches an interactive debugger upon error'
         )
+        parser.add_argument(
+            "--processes", dest="processes", type=int, default=None,
+            help='Run the features of each app in this many worker processes'
+        )
+        parser.add_argument(
+            "--feature-cache", dest="feature_cache", default=False,
+            action="store_true",
+            help='Cache parsed features under .lettuce_cache, so that '
+                 'unchanged feature files are not parsed again'
+        )
+        parser.add_argument(
+            "--stream-results", dest="stream_results", default=False,
+            action="store_true",
+            help='Keep only a summary of each feature once it has run, which '
+                 'bounds the memory used by long runs'
+        )
+        parser.add_argument(
+            "--profile", dest="profile", default=False, action="store_true",
+            help='Report the slowest step definitions and hooks'
+        )
+        parser.add_argument(
+            "--profile-file", dest="profile_file", default=None,
+            help='Write the profile as JSON to this file. Defaults to '
+                 'lettuce-profile.json'
+        )
+        parser.add_argument(
+            "--non-tty", dest="non_tty", default=False, action="store_true",
+            help='Print each step once it ran, instead of rewriting it in '
+                 'place, for output that goes to a log'
+        )
+        parser.add_argument(
+            "--pstats-dir", dest="pstats_dir", default=None,
+            help='Run each feature under cProfile and write its stats, and '
+                 'those of all features merged, to this directory'
+        )
+        parser.add_argument(
+            "--rerun-failed", dest="rerun_failed", default=False,
+            action="store_true",
+            help='Run only the scenarios which failed the last time they '
+                 'ran, as recorded under .lettuce_cache'
+        )
+        parser.add_argument(
+            "--order", dest="order", default=None,
+            choices=["failed-first", "longest-first"],
+            help='Run the features which failed in the last run first '
+                 '(failed-first), or the slowest ones first (longest-first), '
+                 'after the history kept under .lettuce_cache'
+        )
+        parser.add_argument(
+            "--exclude", dest="exclude", default=None, action='append',
+            help='Do not look for features and steps in directories matching '
+                 'this pattern; can be used multiple times. Directories '
+                 'ignored by a .gitignore, node_modules and those of version '
+                 'control are always skipped'
+        )
         if DJANGO_VERSION < StrictVersion('1.7'):
             # Django 1.7 introduces the --no-color flag. We must add the flag
             # to be compatible with older django versions
@@ -215,9 +289,22 @@ class Command(BaseCommand):
                                 enable_jsonreport=options.get('enable_jsonreport'),
                                 xunit_filename=options.get('xunit_file'),
                                 subunit_filename=options.get('subunit_file'),
+                                subunit_chunk_size=options.get('subunit_chunk_size'),
+                                subunit_max_size=options.get('subunit_max_size'),
                                 jsonreport_filename=options.get('jsonreport_file'),
+                                jsonreport_lines=options.get('jsonreport_lines'),
                                 tags=tags, failfast=failfast, auto_pdb=auto_pdb,
-                                smtp_queue=smtp_queue)
+                                smtp_queue=smtp_queue,
+                                processes=options.get('processes'),
+                                feature_cache=options.get('feature_cache'),
+                                stream_results=options.get('stream_results'),
+                                profile=options.get('profile'),
+                                profile_filename=options.get('profile_file'),
+                                pstats_dir=options.get('pstats_dir'),
+                                non_tty=options.get('non_tty'),
+                                rerun_failed=options.get('rerun_failed'),
+                                order=options.get('order'),
+                                exclude=options.get('exclude'))
 
                 result = runner.run()
                 if app_module is not None:
@@ -16,6 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import traceback
 import sys
+import cPickle
 from lettuce.strings import utf8_string
 
 
@@ -53,6 +54,33 @@ class ReasonToFail(object):
             self.cause = utf8_string(msg)
         self.traceback = utf8_string(traceback.format_exc(exc))
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        try:
+            cPickle.loads(cPickle.dumps(self.exception,
+                                        cPickle.HIGHEST_PROTOCOL))
+        except Exception:
+            state['exception'] = ForeignException(self.exception)
+
+        return state
+
+
+class ForeignException(Exception):
+    """ Stands for an exception raised within a step definition that
+    could not be pickled, when a `ReasonToFail` is sent across
+    processes. It keeps the repr of the original exception.
+    """
+    def __init__(self, exception):
+        if isinstance(exception, basestring):
+            representation = exception
+        else:
+            representation = repr(exception)
+
+        super(ForeignException, self).__init__(representation)
+
+    def __repr__(self):
+        return self.args[0]
+
 
 class LettuceSyntaxError(SyntaxError):
     def __init__(self, filename, string):
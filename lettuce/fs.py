@@ -18,40 +18,141 @@ import re
 import os
 import imp
 import sys
+import json
 import codecs
+import cPickle
 import fnmatch
+import hashlib
+import tempfile
 import zipfile
 
 from functools import wraps
 from glob import glob
 from os.path import abspath, join, dirname, curdir, exists
 
+from lettuce.registry import STEP_REGISTRY, CALLBACK_REGISTRY
+from lettuce.timing import clock
+
+
+# directories which never hold features nor step definitions
+DEFAULT_EXCLUDE = ('.git', '.hg', '.svn', 'node_modules')
+
+
+def _gitignore_rules(filename):
+    """Reads the patterns of a .gitignore as (directory, pattern,
+    anchored) tuples. Negated patterns are not supported and skipped."""
+    rules = []
+    directory = dirname(filename)
+    try:
+        with open(filename) as f:
+            lines = f.read().splitlines()
+    except (IOError, OSError):
+        return rules
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or line.startswith('!'):
+            continue
+
+        line = line.rstrip('/')
+        anchored = '/' in line
+        rules.append((directory, line.lstrip('/'), anchored))
+
+    return rules
+
+
+def _ancestor_gitignore_rules(path):
+    """Reads the .gitignore files of the directories above `path`, up to
+    the root of the git repository holding it. Outside of a repository
+    none apply, as git itself would not read them."""
+    rules = []
+    directory = path
+    while not exists(join(directory, '.git')):
+        parent = dirname(directory)
+        if parent == directory:
+            return []
+
+        directory = parent
+        rules = _gitignore_rules(join(directory, '.gitignore')) + rules
+
+    return rules
+
+
+def _gitignore_matches(rule, path, name):
+    directory, pattern, anchored = rule
+    if anchored:
+        return fnmatch.fnmatch(os.path.relpath(path, directory), pattern)
+
+    return fnmatch.fnmatch(name, pattern)
+
 
 class FeatureLoader(object):
     """Loader class responsible for findind features and step
     definitions along a given path on filesystem"""
-    def __init__(self, base_dir, root_dir=None):
+
+    # what each step definitions module was loaded from, shared by all
+    # loaders so that a module is not loaded again by every runner
+    loaded_modules = {}
+
+    def __init__(self, base_dir, root_dir=None, exclude=None):
         self.base_dir = FileSystem.abspath(base_dir)
         if root_dir is None:
             root_dir = '/'
         self.root_dir = FileSystem.abspath(root_dir)
+        self.exclude = exclude
+        self.discovery = None
+        self._scans = {}
 
-    def find_and_load_step_definitions(self):
+    def rescan(self):
+        """Forgets the files found so far, so that the next lookups see
+        the files added or removed since"""
+        self._scans.clear()
+
+    def find_step_definitions_files(self):
         # find steps, possibly up several directories
         base_dir = self.base_dir
         while base_dir != self.root_dir:
-            files = FileSystem.locate(base_dir, '*.py')
+            files = self.scan(base_dir)['*.py']
             if files:
                 break
             base_dir = FileSystem.join(base_dir, '..')
         else:
             # went as far as root_dir, also discover files under root_dir
-            files = FileSystem.locate(base_dir, '*.py')
+            files = self.scan(base_dir)['*.py']
+
+        return files
+
+    def scan(self, directory):
+        """Returns the feature files and python modules under
+        `directory`, walking it only once per loader"""
+        directory = FileSystem.abspath(directory)
+        found = self._scans.get(directory)
+        if found is None:
+            found = self._scans[directory] = FileSystem.scan(
+                directory, ('*.feature', '*.py'), self.exclude)
+
+        return found
+
+    def find_and_load_step_definitions(self):
+        """Imports the step definitions modules, loading again those
+        which changed on disk, or whose steps and hooks were dropped
+        from the registry since.
+
+        `discovery` then holds how long it took, and how many modules
+        were loaded or left as they were.
+        """
+        started = clock()
+        loaded = unchanged = 0
+
+        for filename in self.find_step_definitions_files():
+            to_load = FileSystem.filename(filename, with_extension=False)
+            if self._is_unchanged(to_load, filename):
+                unchanged += 1
+                continue
 
-        for filename in files:
             root = FileSystem.dirname(filename)
             sys.path.insert(0, root)
-            to_load = FileSystem.filename(filename, with_extension=False)
+            imported = to_load in sys.modules
             try:
                 module = __import__(to_load)
             except ValueError as e:
@@ -64,15 +165,153 @@ class FeatureLoader(object):
                               .format(e, filename)),
                     raise e
 
-            reload(module)  # always take fresh meat :)
+            if imported:
+                # the steps and hooks it no longer defines, or defines
+                # differently, must not outlive it
+                STEP_REGISTRY.drop_defined_in(filename)
+                CALLBACK_REGISTRY.drop_defined_in(filename)
+                reload(module)  # always take fresh meat :)
             sys.path.remove(root)
 
+            self.loaded_modules[filename] = self._state_of(filename)
+            loaded += 1
+
+        self.discovery = {
+            'duration': clock() - started,
+            'loaded': loaded,
+            'unchanged': unchanged,
+        }
+
+    def _state_of(self, filename):
+        stat = os.stat(filename)
+        return (stat.st_mtime, stat.st_size,
+                STEP_REGISTRY.generation, CALLBACK_REGISTRY.generation)
+
+    def _is_unchanged(self, name, filename):
+        """Tells whether the module `name` was loaded from `filename`,
+        which did not change since, and its steps and hooks are all
+        still registered"""
+        module = sys.modules.get(name)
+        module_file = getattr(module, '__file__', None)
+        if not module_file or \
+                os.path.splitext(module_file)[0] != os.path.splitext(filename)[0]:
+            return False
+
+        try:
+            return self.loaded_modules.get(filename) == self._state_of(filename)
+        except OSError:
+            return False
+
     def find_feature_files(self):
-        paths = FileSystem.locate(self.base_dir, "*.feature")
+        paths = list(self.scan(self.base_dir)['*.feature'])
         paths.sort()
         return paths
 
 
+class FeatureCache(object):
+    """On-disk cache of parsed features, so that unchanged feature
+    files can be loaded without being parsed again.
+
+    Each feature file has a single entry, a pickle named after a hash of
+    its absolute path, which is replaced when the file changes. The
+    entry holds a hash of the contents it was parsed from, salted with
+    `version` so that upgrading lettuce does not load trees pickled by
+    another version.
+    """
+    def __init__(self, directory, version=''):
+        self.directory = FileSystem.abspath(directory)
+        self.version = version
+
+    def key(self, filename):
+        path = FileSystem.abspath(filename)
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+
+        return hashlib.sha1(path).hexdigest()
+
+    def digest(self, string):
+        digest = hashlib.sha1()
+        for part in (self.version, string):
+            if isinstance(part, unicode):
+                part = part.encode('utf-8')
+            digest.update(part)
+            digest.update('\0')
+
+        return digest.hexdigest()
+
+    def path(self, filename):
+        return FileSystem.join(self.directory, '%s.pickle' % self.key(filename))
+
+    def load(self, filename, string):
+        """Returns the object stored for `filename` if it was made of
+        `string`, or None if there is no such entry or it can't be
+        unpickled"""
+        try:
+            with open(self.path(filename), 'rb') as f:
+                digest, obj = cPickle.load(f)
+        except Exception:
+            return None
+
+        if digest == self.digest(string):
+            return obj
+
+    def store(self, filename, string, obj):
+        """Pickles `obj`, made of `string`, as the entry of `filename`.
+        The entry is written to a temporary file and then renamed, so
+        concurrent runs never see it half written"""
+        try:
+            FileSystem.mkdir(self.directory)
+            fd, temp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                cPickle.dump((self.digest(string), obj), f,
+                             cPickle.HIGHEST_PROTOCOL)
+            os.rename(temp, self.path(filename))
+        except Exception:
+            pass
+
+
+class LastRun(object):
+    """State left by the previous runs for the next one, keyed by the
+    absolute path of each feature file: the 1-based numbers of the
+    scenarios which failed the last time they ran, and how long each
+    feature took the last time it ran"""
+    def __init__(self, filename):
+        self.filename = FileSystem.abspath(filename)
+
+    def load(self):
+        """Returns a dict with the `failed` scenarios and the `durations`
+        of features, or None if no state was left or it can't be read"""
+        try:
+            with open(self.filename) as f:
+                state = json.load(f)
+
+            return {
+                'failed': dict(
+                    (path, [int(number) for number in numbers])
+                    for path, numbers in state['failed'].items()),
+                'durations': dict(
+                    (path, float(duration))
+                    for path, duration in state.get('durations', {}).items()),
+            }
+        except Exception:
+            return None
+
+    def store(self, failed, durations=None):
+        """Writes the state to a temporary file which is then renamed,
+        so a run which is killed never leaves half of it"""
+        try:
+            directory = dirname(self.filename)
+            FileSystem.mkdir(directory)
+            fd, temp = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps({'failed': failed,
+                                    'durations': durations or {}},
+                                   indent=2, sort_keys=True))
+            os.rename(temp, self.filename)
+        except Exception:
+            pass
+
+
 class FileSystem(object):
     """File system abstraction, mainly used for indirection, so that
     lettuce can be well unit-tested :)
@@ -196,6 +435,50 @@ class FileSystem(object):
         '''Walks through filesystem'''
         return os.walk(path)
 
+    @classmethod
+    def scan(cls, path, matches, exclude=None):
+        """Walks `path` once, returning a dict with the files matching
+        each pattern of `matches`.
+
+        Directories are not walked into when their name, or their path
+        relative to `path`, matches a pattern of DEFAULT_EXCLUDE or of
+        `exclude`, or when a .gitignore ignores them: one found on the
+        way, or one of the directories above `path` within its git
+        repository.
+        """
+        root_path = cls.abspath(path)
+        exclude = DEFAULT_EXCLUDE + tuple(exclude or ())
+
+        found = dict((match, []) for match in matches)
+        ignores = {root_path: _ancestor_gitignore_rules(root_path)}
+        for path, dirs, files in cls.walk(root_path):
+            rules = ignores.pop(path, [])
+            if '.gitignore' in files:
+                rules = rules + _gitignore_rules(cls.join(path, '.gitignore'))
+
+            kept = []
+            for name in dirs:
+                full_path = cls.join(path, name)
+                relative = os.path.relpath(full_path, root_path)
+                if any(fnmatch.fnmatch(name, pattern) or
+                       fnmatch.fnmatch(relative, pattern)
+                       for pattern in exclude):
+                    continue
+
+                if any(_gitignore_matches(rule, full_path, name)
+                       for rule in rules):
+                    continue
+
+                ignores[full_path] = rules
+                kept.append(name)
+
+            dirs[:] = kept
+            for match in matches:
+                for filename in fnmatch.filter(files, match):
+                    found[match].append(cls.join(path, filename))
+
+        return found
+
     @classmethod
     def locate(cls, path, match, recursive=True):
         """Locate files recursively in a given path"""
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Line oriented parser for feature files.
+
+Each line is read exactly once: `tokenize` classifies it and keeps its
+line number, and the `parse_*` functions assemble the tokens into plain
+nodes which lettuce.core turns into Feature, Scenario and Step objects.
+
+The text after `Examples:` names the table and is not kept, and the
+header of every examples table but the first is skipped: all the rows
+of a scenario share the keys of its first table.
+"""
+import re
+
+from lettuce.exceptions import LettuceSyntaxError
+
+FEATURE = 'feature'
+BACKGROUND = 'background'
+SCENARIO = 'scenario'
+EXAMPLES = 'examples'
+TAGS = 'tags'
+TABLE = 'table'
+MULTILINE = 'multiline'
+TEXT = 'text'
+
+# states of an examples table: its redundant header row is skipped
+HEADER = 'header'
+ROWS = 'rows'
+
+_keyword_regexes = {}
+
+
+def keyword_regex(language):
+    """Returns a single precompiled regex that recognizes every
+    keyword line of the given language"""
+    regex = _keyword_regexes.get(language.code)
+    if regex is None:
+        alternatives = u"|".join(
+            u"(?P<%s>%s)" % (kind, getattr(language, kind))
+            for kind in (FEATURE, BACKGROUND, 'scenario_separator', EXAMPLES))
+
+        regex = re.compile(
+            u"^(?:%s):(?P<rest>.*)$" % alternatives, re.U | re.I)
+        _keyword_regexes[language.code] = regex
+
+    return regex
+
+
+def tokenize(lines, language=None):
+    """Classifies each line of a feature, yielding tuples of
+    (kind, line number, stripped line, value).
+
+    Blank lines and comments are skipped. `value` holds the text after
+    the colon for keyword lines and the list of tags for tag lines.
+    Without a language, keywords are not recognized at all.
+    """
+    keyword = language and keyword_regex(language)
+    in_multiline = False
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith(u'#'):
+            continue
+
+        if line.startswith(u'"""'):
+            in_multiline = not in_multiline
+            yield MULTILINE, number, line, None
+
+        elif in_multiline:
+            yield MULTILINE, number, line, None
+
+        elif line.startswith(u'|'):
+            yield TABLE, number, line, None
+
+        elif line.startswith(u'@'):
+            tags = [w[1:] for w in line.split() if w.startswith(u'@')]
+            yield TAGS, number, line, filter(None, tags)
+
+        else:
+            matched = keyword and keyword.match(line)
+            if not matched:
+                yield TEXT, number, line, None
+                continue
+
+            value = matched.group('rest').strip()
+            if matched.group('scenario_separator') is not None:
+                yield SCENARIO, number, line, value
+            else:
+                for kind in (FEATURE, BACKGROUND, EXAMPLES):
+                    if matched.group(kind) is not None:
+                        yield kind, number, line, value
+                        break
+
+
+class StepNode(object):
+    """A step sentence followed by the lines of its table or
+    multiline string"""
+    def __init__(self, sentence, line):
+        self.sentence = sentence
+        self.line = line
+        self.lines = []
+
+
+class ScenarioNode(object):
+    """A scenario, its steps and the rows of its examples, the header
+    of the first examples table included"""
+    def __init__(self, name, line, tags):
+        self.name = name
+        self.line = line
+        self.tags = tags
+        self.steps = []
+        self.examples = []
+
+
+class FeatureNode(object):
+    """A feature, with the line numbers of its description"""
+    def __init__(self, name, line, tags):
+        self.name = name
+        self.line = line
+        self.tags = tags
+        self.description = []
+        self.description_at = []
+        self.background = None
+        self.scenarios = []
+
+
+def _add_to_steps(steps, kind, number, line):
+    if kind is TEXT:
+        steps.append(StepNode(line, number))
+
+    elif not steps:
+        raise LettuceSyntaxError(
+            None,
+            '\nFirst line of step "%s" is in %s form.' % (
+                line, kind is TABLE and 'table' or 'multiline'))
+
+    else:
+        steps[-1].lines.append(line)
+
+
+def _add_to_scenario(scenario, kind, number, line, filename):
+    if kind is TABLE and not scenario.steps:
+        raise LettuceSyntaxError(
+            filename,
+            '\nInvalid step on scenario "%s".\n'
+            'Maybe you killed the first step text of that scenario\n' %
+            scenario.name)
+
+    if kind not in (TABLE, MULTILINE):
+        kind = TEXT
+
+    _add_to_steps(scenario.steps, kind, number, line)
+
+
+def _join_tags(tags):
+    return [tag for number, line, value in tags for tag in value]
+
+
+def parse_steps(lines):
+    """Parses lines which contain nothing but steps, ignoring tags"""
+    steps = []
+    for kind, number, line, value in tokenize(lines):
+        if kind is not TAGS:
+            _add_to_steps(steps, kind, number, line)
+
+    return steps
+
+
+def parse_scenario(lines, language, filename=None):
+    """Parses a single scenario, along with its examples"""
+    scenario = None
+    examples = None
+
+    for kind, number, line, value in tokenize(lines, language):
+        if kind is TAGS:
+            continue
+
+        if scenario is None:
+            name = kind is SCENARIO and value or line
+            scenario = ScenarioNode(name, number, None)
+
+        elif kind is EXAMPLES:
+            # the header of any examples table but the first is redundant
+            examples = scenario.examples and HEADER or ROWS
+
+        elif examples is not None:
+            if kind is TABLE and examples is ROWS:
+                scenario.examples.append(line)
+            examples = ROWS
+
+        else:
+            _add_to_scenario(scenario, kind, number, line, filename)
+
+    return scenario
+
+
+def parse_feature(lines, language, filename=None):
+    """Parses a whole feature: its tags, description, background and
+    scenarios"""
+    feature = None
+    scenario = None
+    steps = None
+    examples = None
+    tags = []
+
+    for kind, number, line, value in tokenize(lines, language):
+        if kind is TAGS:
+            tags.append((number, line, value))
+            continue
+
+        if feature is None:
+            if kind is FEATURE and not value:
+                break
+
+            if kind is FEATURE:
+                feature = FeatureNode(value, number, _join_tags(tags))
+
+            tags = []
+
+        elif kind is FEATURE:
+            raise LettuceSyntaxError(
+                filename, 'A feature file must contain ONLY ONE feature!')
+
+        elif kind is SCENARIO:
+            if not value:
+                raise LettuceSyntaxError(
+                    filename,
+                    ('In the feature "%s", scenarios '
+                     'must have a name, make sure to declare a scenario like '
+                     'this: `Scenario: name of your scenario`' % feature.name))
+
+            scenario = ScenarioNode(value, number, _join_tags(tags))
+            feature.scenarios.append(scenario)
+            examples = None
+            tags = []
+
+        elif steps is None and scenario is None:
+            # tags which are not followed by a scenario are plain text
+            for tag_number, tag_line, tag_value in tags:
+                feature.description.append(tag_line)
+                feature.description_at.append(tag_number)
+
+            tags = []
+            if kind is BACKGROUND:
+                feature.background = steps = []
+            else:
+                feature.description.append(line)
+                feature.description_at.append(number)
+
+        elif scenario is None:
+            tags = []
+            if kind not in (TABLE, MULTILINE):
+                kind = TEXT
+
+            _add_to_steps(steps, kind, number, line)
+
+        elif kind is EXAMPLES:
+            tags = []
+            examples = scenario.examples and HEADER or ROWS
+
+        elif examples is not None:
+            tags = []
+            if kind is TABLE and examples is ROWS:
+                scenario.examples.append(line)
+            examples = ROWS
+
+        else:
+            tags = []
+            _add_to_scenario(scenario, kind, number, line, filename)
+
+    if feature is None:
+        raise LettuceSyntaxError(
+            filename,
+            'Features must have a name. e.g: "Feature: This is my name"')
+
+    if not (feature.scenarios or feature.description or tags or
+            feature.background is not None):
+        raise LettuceSyntaxError(
+            filename,
+            (u"Features must have scenarios.\n"
+             "Please refer to the documentation available at "
+             "http://lettuce.it for more information."))
+
+    return feature
@@ -16,7 +16,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import re
-import sys
 
 from lettuce import core
 from lettuce import strings
@@ -27,10 +26,19 @@ from lettuce.terrain import before
 from lettuce.terrain import world
 
 
+# when False, as when the output goes to a log rather than a terminal,
+# steps are printed once they ran instead of being rewritten in place
+rewrite_in_place = True
+
+writer = terminal.BufferedWriter()
+
+
 def wrt(what):
-    if isinstance(what, unicode):
-        what = what.encode('utf-8')
-    sys.stdout.write(what)
+    writer.write(what)
+
+
+def flush():
+    writer.flush()
 
 
 def wrap_file_and_line(string, start, end):
@@ -60,9 +68,19 @@ def write_out(what):
 
 @before.each_step
 def print_step_running(step):
+    write_step_running(step)
+    # whatever the step itself prints must come after what lettuce
+    # printed so far, and a terminal shows the step while it runs
+    flush()
+
+
+def write_step_running(step):
     if not step.defined_at or not step.display:
         return
 
+    if not rewrite_in_place and not (step.scenario and step.scenario.outlines):
+        return
+
     color = '\033[1;30m'
 
     if step.scenario and step.scenario.outlines:
@@ -83,7 +101,7 @@ def print_step_ran(step):
     if step.scenario and step.scenario.outlines and (step.failed or step.passed or step.defined_at):
         return
 
-    if step.hashes and step.defined_at:
+    if step.hashes and step.defined_at and rewrite_in_place:
         write_out("\033[A" * (len(step.hashes) + 1))
 
     string = step.represent_string(step.original_sentence)
@@ -91,15 +109,7 @@ def print_step_ran(step):
     if not step.failed:
         string = wrap_file_and_line(string, '\033[1;30m', '\033[0m')
 
-    prefix = '\033[A'
-    width, height = terminal.get_size()
-    lines_up = len(string) / float(width)
-    if lines_up < 1:
-        lines_up = 1
-    else:
-        lines_up = int(lines_up) + 1
-
-    #prefix = prefix * lines_up
+    prefix = rewrite_in_place and '\033[A' or ''
 
     if step.failed:
         color = "\033[0;31m"
@@ -132,6 +142,7 @@ def print_step_ran(step):
                 wrt("\n")
 
         wrt("\033[0m\n")
+        flush()
 
 
 @before.each_scenario
@@ -192,10 +203,21 @@ def print_feature_running(feature):
         line = wrap_file_and_line(line, '\033[1;30m', '\033[0m')
         write_out("\033[1;37m%s\n" % line)
 
+@after.each_scenario
+def flush_scenario(scenario):
+    flush()
+
+
+@after.each_feature
+def flush_feature(feature):
+    flush()
+
+
 @after.harvest
 @after.all
 def print_end(total=None):
     if total is None:
+        flush()
         return
     write_out("\n")
     if isinstance(total, core.SummaryTotalResults):
@@ -286,6 +308,8 @@ def print_end(total=None):
         wrt("\033[0m")
         wrt("\n")
 
+    flush()
+
 
 def print_no_features_found(where):
     where = core.fs.relpath(where)
@@ -296,6 +320,7 @@ def print_no_features_found(where):
     write_out(
         '\033[1;37mcould not find features at '
         '\033[1;33m%s\033[0m\n' % where)
+    flush()
 
 
 @before.each_background
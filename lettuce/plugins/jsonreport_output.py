@@ -1,19 +1,32 @@
-from datetime import datetime
 import json
+import os
 
-from lettuce import world
 from lettuce.terrain import after, before
 
 
-def enable(filename=None):
+def enable(filename=None, lines=False):
+    if lines:
+        return enable_lines(filename or "lettucetests.jsonl")
+
     filename = filename or "lettucetests.json"
 
+    features = []
+
     @before.all
-    def before_all():
+    def reset_features():
         """
-        Set `world._started` to `datetime.now()` to track total duration.
+        Start each run with no features, as harvest makes one run per
+        app in the same process.
         """
-        world._started = datetime.now()
+        del features[:]
+
+    @after.feature_result
+    def collect_feature_data(feature_result):
+        """
+        Extract the data of each feature as soon as it has run, so that
+        a streaming `TotalResult` does not need to keep its steps.
+        """
+        features.append(extract_feature_data(feature_result))
 
     @after.all
     def generate_json_output(total):
@@ -21,48 +34,159 @@ def enable(filename=None):
         This callback is called after all the features are
         ran.
         """
-        world._stopped = datetime.now()
-        total_dict = total_result_to_dict(total)
+        total_dict = total_result_to_dict(total, features)
         with open(filename, "w") as handle:
             json.dump(total_dict, handle)
 
+
+def enable_lines(filename):
+    """
+    Write a JSON Lines report: one record per step, scenario and feature,
+    each written as soon as it has run, followed by a record of the
+    totals. Nothing is kept once written, and durations are in float
+    seconds.
+    """
+    pid = os.getpid()
+    # records of a feature run by a worker process, kept until the
+    # feature is done so they can be carried back to this process
+    detached = []
+    counts = {}
+    report = {}
+
+    def write_line(line):
+        report["stream"].write(line)
+        report["stream"].flush()
+
+    def write_record(record):
+        line = json.dumps(record) + "\n"
+        if os.getpid() == pid:
+            write_line(line)
+        else:
+            detached.append(line)
+
+    @before.all
+    def open_report():
+        report["stream"] = open(filename, "w")
+
     @before.each_feature
+    def reset_feature_meta(feature):
+        counts["feature"] = {
+            "steps": _empty_meta(),
+            "scenarios": _empty_meta(),
+        }
+
     @before.each_scenario
-    @before.each_step
-    def before_each_element(*args):
-        """
-        Set `step._started`, `scenario._started` or `feature._started` to `datetime.now()`
-        to track step/scenario/feature duration.
-        """
-        element = args[0]
-        element._started = datetime.now()
+    def reset_scenario_meta(scenario):
+        counts["scenario"] = _empty_meta()
 
-    @after.each_feature
-    @after.each_scenario
     @after.each_step
-    def after_each_element(*args):
-        """
-        Set `step._stopped`, `scenario._stopped` or `feature._stopped` to `datetime.now()`
-        to track step/scenario/feature duration.
-        """
-        element = args[0]
-        element._stopped = datetime.now()
+    def write_step_record(step):
+        parent = step.scenario or step.background
+        step_data = extract_step_data(step, precise=True)
+        step_data["type"] = "step"
+        step_data["feature"] = parent.feature.name
+        step_data["scenario"] = getattr(parent, 'name', None)
+        write_record(step_data)
+
+        if step.scenario is None:
+            return
+
+        meta = counts["scenario"]
+        meta["total"] += 1
+        for key, counted in (("success", "success"), ("failures", "failed"),
+                             ("skipped", "skipped"), ("undefined", "undefined")):
+            meta[key] += step_data["meta"][counted]
+
+    @after.each_scenario
+    def write_scenario_record(scenario):
+        meta = counts["scenario"]
+        write_record({
+            "type": "scenario",
+            "feature": scenario.feature.name,
+            "name": scenario.name,
+            "duration": _get_duration(scenario, precise=True),
+            "outlines": len(scenario.outlines),
+            "meta": meta,
+        })
 
+        feature_meta = counts["feature"]
+        _count_scenario(feature_meta, meta)
 
-def total_result_to_dict(total):
+    @after.each_feature
+    def write_feature_record(feature):
+        write_record({
+            "type": "feature",
+            "name": feature.name,
+            "duration": _get_duration(feature, precise=True),
+            "meta": counts["feature"],
+        })
+
+        if os.getpid() != pid:
+            feature.jsonreport_records = list(detached)
+            del detached[:]
+
+    @after.feature_result
+    def adopt_records(feature_result):
+        for line in getattr(feature_result.feature, 'jsonreport_records', ()):
+            write_line(line)
+
+    @after.all
+    def write_total_record(total):
+        write_record({
+            "type": "total",
+            "duration": _get_duration(total, precise=True),
+            "meta": extract_meta(total),
+        })
+        report.pop("stream").close()
+
+
+def _empty_meta():
+    return {
+        "total": 0,
+        "success": 0,
+        "failures": 0,
+        "skipped": 0,
+        "undefined": 0,
+    }
+
+
+def _count_scenario(meta, scenario_meta):
+    """
+    Add the step counts of a scenario to the meta of its feature.
+    """
+    success = (
+        not scenario_meta["failures"] and
+        not scenario_meta["skipped"] and
+        not scenario_meta["undefined"]
+    )
+    meta["scenarios"]["total"] += 1 if scenario_meta["total"] else 0
+    meta["scenarios"]["success"] += 1 if success else 0
+    meta["scenarios"]["failures"] += 1 if scenario_meta["failures"] else 0
+    meta["scenarios"]["skipped"] += 1 if scenario_meta["skipped"] else 0
+    meta["scenarios"]["undefined"] += 1 if scenario_meta["undefined"] else 0
+    for key in scenario_meta:
+        meta["steps"][key] += scenario_meta[key]
+
+
+def total_result_to_dict(total, features=None):
     """
     Transform a `TotalResult` to a json-serializable Python dictionary.
 
     :param total:               a `TotalResult` instance
+    :param features:            the data of each feature, when already
+                                extracted while the features ran
     :return:                    a Python dictionary
     """
-    return {
-        "meta": extract_meta(total),
-        "duration": _get_duration(world),
-        "features": [
+    if features is None:
+        features = [
             extract_feature_data(feature_result)
             for feature_result in total.feature_results
         ]
+
+    return {
+        "meta": extract_meta(total),
+        "duration": _get_duration(total),
+        "features": features
     }
 
 
@@ -75,41 +199,13 @@ def extract_feature_data(feature_result):
     """
     scenarios = []
     meta = {
-        "steps": {
-            "total": 0,
-            "success": 0,
-            "failures": 0,
-            "skipped": 0,
-            "undefined": 0,
-        },
-        "scenarios": {
-            "total": 0,
-            "success": 0,
-            "failures": 0,
-            "skipped": 0,
-            "undefined": 0,
-        }
+        "steps": _empty_meta(),
+        "scenarios": _empty_meta(),
     }
     for scenario_result in feature_result.scenario_results:
         scenario_data = extract_scenario_data(scenario_result)
         scenarios.append(scenario_data)
-        # scenarios
-        success = (
-            not scenario_data["meta"]["failures"] and
-            not scenario_data["meta"]["skipped"] and
-            not scenario_data["meta"]["undefined"]
-        )
-        meta["scenarios"]["total"] += 1 if scenario_data["meta"]["total"] else 0
-        meta["scenarios"]["success"] += 1 if success else 0
-        meta["scenarios"]["failures"] += 1 if scenario_data["meta"]["failures"] else 0
-        meta["scenarios"]["skipped"] += 1 if scenario_data["meta"]["skipped"] else 0
-        meta["scenarios"]["undefined"] += 1 if scenario_data["meta"]["undefined"] else 0
-        # steps
-        meta["steps"]["total"] += scenario_data["meta"]["total"]
-        meta["steps"]["success"] += scenario_data["meta"]["success"]
-        meta["steps"]["failures"] += scenario_data["meta"]["failures"]
-        meta["steps"]["skipped"] += scenario_data["meta"]["skipped"]
-        meta["steps"]["undefined"] += scenario_data["meta"]["undefined"]
+        _count_scenario(meta, scenario_data["meta"])
 
     return {
         "name": feature_result.feature.name,
@@ -151,7 +247,7 @@ def extract_scenario_data(scenario_result):
     """
     return {
         "name": scenario_result.scenario.name,
-        "duration": _get_duration(scenario_result.scenario),
+        "duration": _get_duration(scenario_result),
         "outline": scenario_result.outline,
         "meta": {
             "total": scenario_result.total_steps,
@@ -164,16 +260,17 @@ def extract_scenario_data(scenario_result):
     }
 
 
-def extract_step_data(step):
+def extract_step_data(step, precise=False):
     """
     Extract data from a `Step` instance.
 
     :param step:                         a `Step` instance
+    :param precise:                      give the duration in float seconds
     :return                              a Python dictionary
     """
     step_data = {
         "name": step.sentence,
-        "duration": _get_duration(step),
+        "duration": _get_duration(step, precise),
         "meta": {
             "success": bool(step.passed),
             "failed": bool(step.failed),
@@ -219,10 +316,16 @@ def extract_meta(total):
     }
 
 
-def _get_duration(element):
+def _get_duration(element, precise=False):
     """
-    Return the duration of an element.
+    Return the duration of an element, in whole seconds.
 
-    :param element:          either a step or a scenario or a feature
+    :param element:          either a step, a scenario result, a feature
+                             or the total result
+    :param precise:          return float seconds instead
     """
-    return (element._stopped - element._started).seconds if hasattr(element, '_started') else None
+    duration = getattr(element, 'duration', None)
+    if duration is None or precise:
+        return duration
+
+    return int(duration)
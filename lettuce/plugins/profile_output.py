@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import json
+
+from lettuce.fs import FileSystem
+from lettuce.registry import HOOK_DURATIONS
+from lettuce.terrain import after
+from lettuce.timing import Durations
+
+
+def wrt(what):
+    if isinstance(what, unicode):
+        what = what.encode('utf-8')
+    sys.stdout.write(what)
+
+
+def summarize(timings):
+    """Turns the lettuce.timing.Durations of each step definition or
+    hook into a list of statistics, the most time consuming first"""
+    stats = []
+    for name, durations in timings.iteritems():
+        stats.append({
+            "name": name,
+            "calls": durations.calls,
+            "total": durations.total,
+            "mean": durations.total / durations.calls,
+            "p95": durations.percentile(95),
+        })
+
+    stats.sort(key=lambda stat: stat["total"], reverse=True)
+    return stats
+
+
+def hook_name(kind, situation, callback):
+    code = getattr(callback, 'func_code', None)
+    where = code and u'%s:%d' % (FileSystem.relpath(code.co_filename),
+                                 code.co_firstlineno) or u'?'
+    name = getattr(callback, '__name__', repr(callback))
+    return u'%s %s: %s (%s)' % (situation, kind, name, where)
+
+
+def print_table(title, stats, top):
+    wrt(u"\n%s (top %d of %d):\n" % (title, min(top, len(stats)), len(stats)))
+    wrt(u"%8s %11s %11s %11s  %s\n" % ('calls', 'total', 'mean', 'p95', 'name'))
+    for stat in stats[:top]:
+        wrt(u"%8d %10.4fs %10.4fs %10.4fs  %s\n" % (
+            stat["calls"], stat["total"], stat["mean"], stat["p95"],
+            stat["name"]))
+
+
+def enable(filename=None, top=10):
+    filename = filename or "lettuce-profile.json"
+    pid = os.getpid()
+    steps = {}
+    hooks = {}
+
+    def merge(timings, more):
+        for name, durations in more.iteritems():
+            timings.setdefault(name, Durations()).merge(durations)
+
+    def take_hook_durations():
+        timings = {}
+        for (kind, situation, callback), durations in HOOK_DURATIONS.items():
+            if callback not in own_callbacks:
+                name = hook_name(kind, situation, callback)
+                timings.setdefault(name, Durations()).merge(durations)
+
+        HOOK_DURATIONS.clear()
+        return timings
+
+    @after.each_step
+    def time_step(step):
+        if step.duration is None or not step.defined_at:
+            return
+
+        name = u'%s:%d' % (step.defined_at.file, step.defined_at.line)
+        steps.setdefault(name, Durations()).add(step.duration)
+
+    @after.each_feature
+    def detach_timings(feature):
+        # features run by worker processes (see lettuce.Runner's
+        # `processes`) carry their timings back to this one
+        if os.getpid() == pid:
+            return
+
+        feature.profile_timings = dict(steps), take_hook_durations()
+        steps.clear()
+
+    @after.feature_result
+    def adopt_timings(feature_result):
+        worker_steps, worker_hooks = getattr(
+            feature_result.feature, 'profile_timings', ({}, {}))
+        merge(steps, worker_steps)
+        merge(hooks, worker_hooks)
+
+    @after.all
+    def output_profile(total):
+        merge(hooks, take_hook_durations())
+        report = {
+            "duration": total.duration,
+            "discovery": total.discovery,
+            "steps": summarize(steps),
+            "hooks": summarize(hooks),
+        }
+
+        if total.discovery:
+            wrt(u"\nStep definitions discovered in %.4fs "
+                u"(%d modules loaded, %d unchanged)\n" % (
+                    total.discovery["duration"], total.discovery["loaded"],
+                    total.discovery["unchanged"]))
+
+        print_table(u"Slowest step definitions", report["steps"], top)
+        print_table(u"Slowest hooks", report["hooks"], top)
+        wrt(u"\nProfile written to %s\n" % filename)
+
+        with open(filename, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    own_callbacks = set([time_step, detach_timings, adopt_timings,
+                         output_profile])
@@ -16,18 +16,30 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
-import sys
 from lettuce import core
 from lettuce import strings
+from lettuce import terminal
 from lettuce.terrain import after
 from lettuce.terrain import before
 from lettuce.terrain import world
 
 
+writer = terminal.BufferedWriter()
+
+
 def wrt(what):
-    if isinstance(what, unicode):
-        what = what.encode('utf-8')
-    sys.stdout.write(what)
+    writer.write(what)
+
+
+def flush():
+    writer.flush()
+
+
+@before.each_step
+def flush_before_step(step):
+    # whatever the step itself prints must come after what lettuce
+    # printed so far
+    flush()
 
 
 @after.each_step
@@ -49,6 +61,8 @@ def print_step_running(step):
         for line in step.why.traceback.splitlines():
             print_spaced(line)
 
+        flush()
+
 
 @before.each_scenario
 def print_scenario_running(scenario):
@@ -105,6 +119,16 @@ def print_feature_running(feature):
     wrt("\n")
     wrt(feature.represented())
 
+@after.each_scenario
+def flush_scenario(scenario):
+    flush()
+
+
+@after.each_feature
+def flush_feature(feature):
+    flush()
+
+
 @after.harvest
 @after.all
 def print_end(total=None):
@@ -161,6 +185,8 @@ def print_end(total=None):
             wrt(scenario)
         wrt("\n")
 
+    flush()
+
 def print_no_features_found(where):
     where = core.fs.relpath(where)
     if not where.startswith(os.sep):
@@ -168,3 +194,4 @@ def print_no_features_found(where):
 
     wrt('Oops!\n')
     wrt('could not find features at %s\n' % where)
+    flush()
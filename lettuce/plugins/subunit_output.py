@@ -17,13 +17,17 @@
 
 import datetime
 import sys
-from StringIO import StringIO
 
 from lettuce.terrain import before, after
 
 from subunit.v2 import StreamResultToBytes
 from subunit.iso8601 import Utc
 
+# captured output is sent in packets of at most CHUNK_SIZE bytes, and
+# only the first MAX_SIZE bytes of each attachment are kept
+CHUNK_SIZE = 64 * 1024
+MAX_SIZE = 16 * 1024 * 1024
+
 
 def open_file(filename):
     """
@@ -47,9 +51,93 @@ def close_file(file_):
     file_.close()
 
 
-def enable(filename=None):
+class ChunkedAttachment(object):
+    """
+    A file-like object which streams what is written to it as a subunit
+    attachment, one packet every `chunk_size` bytes, so that a chatty
+    scenario does not hold all of its output in memory.
+
+    Once `max_size` bytes were written, the rest is dropped and a marker
+    notes that the attachment was truncated.
+    """
+
+    mime_type = 'text/plain; charset=utf8'
+    truncated_marker = '\n[output truncated after {size} bytes]\n'
+
+    def __init__(self, streamresult, test_id, file_name,
+                 chunk_size=CHUNK_SIZE, max_size=MAX_SIZE):
+        self.streamresult = streamresult
+        self.test_id = test_id
+        self.file_name = file_name
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.pending = []
+        self.pending_size = 0
+        self.size = 0
+        self.truncated = False
+
+    def write(self, data):
+        if self.truncated:
+            return
+
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+
+        if self.max_size is not None and \
+                self.size + len(data) > self.max_size:
+            data = data[:self.max_size - self.size]
+            self.truncated = True
+
+        self.size += len(data)
+        self.pending.append(data)
+        self.pending_size += len(data)
+
+        if self.truncated:
+            self.pending.append(
+                self.truncated_marker.format(size=self.max_size))
+            self.send()
+        elif self.pending_size >= self.chunk_size:
+            self.send()
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def send(self, eof=False):
+        data = ''.join(self.pending)
+        self.pending = []
+        self.pending_size = 0
+
+        for start in range(0, len(data), self.chunk_size):
+            self.streamresult.status(
+                test_id=self.test_id,
+                file_name=self.file_name,
+                file_bytes=data[start:start + self.chunk_size],
+                mime_type=self.mime_type)
+
+        if eof:
+            self.streamresult.status(test_id=self.test_id,
+                                     file_name=self.file_name,
+                                     file_bytes='',
+                                     mime_type=self.mime_type,
+                                     eof=True)
+
+    def close(self):
+        self.send(eof=True)
+
+
+def enable(filename=None, chunk_size=None, max_size=None):
 
     file_ = open_file(filename)
+    chunk_size = chunk_size or CHUNK_SIZE
+    max_size = max_size or MAX_SIZE
+
+    def attachment(scenario, file_name):
+        return ChunkedAttachment(streamresult, get_test_id(scenario),
+                                 file_name, chunk_size, max_size)
 
     streamresult = StreamResultToBytes(file_)
     streamresult.startTestRun()
@@ -61,8 +149,9 @@ def enable(filename=None):
     def before_scenario(scenario):
 
         # create redirects for stdout and stderr
-        scenario.stdout = StringIO()
-        scenario.stderr = StringIO()
+        scenario.stdout = attachment(scenario, 'stdout')
+        scenario.stderr = attachment(scenario, 'stderr')
+        scenario.steps_attachment = attachment(scenario, 'steps')
         try:
             test_tags = scenario.tags
         except AttributeError:
@@ -93,17 +182,9 @@ def enable(filename=None):
     @after.each_scenario
     def after_scenario(scenario):
 
-        streamresult.status(test_id=get_test_id(scenario),
-                            file_name='stdout',
-                            file_bytes=scenario.stdout.getvalue().encode('utf-8'),
-                            mime_type='text/plain; charset=utf8',
-                            eof=True)
-
-        streamresult.status(test_id=get_test_id(scenario),
-                            file_name='stderr',
-                            file_bytes=scenario.stderr.getvalue().encode('utf-8'),
-                            mime_type='text/plain; charset=utf8',
-                            eof=True)
+        scenario.stdout.close()
+        scenario.stderr.close()
+        scenario.steps_attachment.close()
 
         if scenario.passed:
             streamresult.status(test_id=get_test_id(scenario),
@@ -143,13 +224,9 @@ def enable(filename=None):
         else:
             raise AssertionError("Internal error")
 
-        steps = u'{marker} {sentence}\n'.format(
+        step.scenario.steps_attachment.write(u'{marker} {sentence}\n'.format(
             marker=marker,
-            sentence=step.sentence)
-        streamresult.status(test_id=test_id,
-                        file_name='steps',
-                        file_bytes=steps.encode('utf-8'),
-                        mime_type='text/plain; charset=utf8')
+            sentence=step.sentence))
 
     @after.all
     def after_all(total):
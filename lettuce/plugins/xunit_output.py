@@ -15,42 +15,98 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from datetime import datetime, timedelta
+import os
+from datetime import datetime
 from lettuce.terrain import after
-from lettuce.terrain import before
 from xml.dom import minidom
-from lettuce.strings import utf8_string
-
-
-def wrt_output(filename, content):
-    f = open(filename, "w")
-    if isinstance(content, unicode):
-        content = content.encode('utf-8')
-
-    f.write(content)
-    f.close()
-
-
-def write_xml_doc(filename, doc):
-    wrt_output(filename, doc.toxml())
-
+from xml.sax.saxutils import quoteattr
+
+
+def format_seconds(duration):
+    # xs:decimal has no exponent notation
+    return "%.6f" % (duration or 0)
+
+
+class XunitWriter(object):
+    """Writes a JUnit XML report to disk one test case at a time.
+
+    The testsuite start tag leaves room for the totals, which are
+    written over that room when a run is over. The closing tag follows
+    every test case written, so the file is well formed whenever a run
+    stops. Runs made later by the same process, as harvest makes one per
+    app, carry on after the test cases already written and add up to
+    the totals.
+    """
+    totals_width = 80
+    trailer = "</testsuite>"
+
+    def __init__(self, filename, timestamp):
+        self.filename = filename
+        self.timestamp = timestamp
+        self.stream = None
+        self.totals_at = None
+        self.cases_end = None
+        self.tests = 0
+        self.failures = 0
+
+    def open(self):
+        if self.totals_at is not None and os.path.exists(self.filename):
+            self.stream = open(self.filename, "r+b")
+            return
 
-def total_seconds(td):
-    return (td.microseconds + (td.seconds + td.days * 24 * 3600) * 1e6) / 1e6
+        self.tests = self.failures = 0
+        self.stream = open(self.filename, "wb")
+        self.stream.write('<?xml version="1.0" ?><testsuite hostname="localhost" '
+                          'name="lettuce" timestamp=%s' % quoteattr(self.timestamp))
+        self.totals_at = self.stream.tell()
+        self.stream.write(" " * self.totals_width + ">")
+        self.cases_end = self.stream.tell()
+        self.stream.write(self.trailer)
+        self.stream.flush()
+
+    def write(self, xml):
+        if self.stream is None:
+            self.open()
+
+        if isinstance(xml, unicode):
+            xml = xml.encode('utf-8')
+        self.stream.seek(self.cases_end)
+        self.stream.write(xml)
+        self.cases_end = self.stream.tell()
+        self.stream.write(self.trailer)
+        self.stream.flush()
+
+    def close(self, tests, failures):
+        if self.stream is None:
+            self.open()
+
+        self.tests += tests
+        self.failures += failures
+        totals = ' errors="0" failures="%d" tests="%d" time="0"' % (
+            self.failures, self.tests)
+        self.stream.seek(self.totals_at)
+        self.stream.write(totals.ljust(self.totals_width))
+        self.stream.close()
+        self.stream = None
 
 
 def enable(filename=None):
 
     doc = minidom.Document()
-    root = doc.createElement("testsuite")
-    root.setAttribute("name", "lettuce")
-    root.setAttribute("hostname", "localhost")
-    root.setAttribute("timestamp", datetime.now().strftime("%Y-%m-%dT%H:%M:%S"))
-    output_filename = filename or "lettucetests.xml"
-
-    @before.each_step
-    def time_step(step):
-        step.started = datetime.now()
+    timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    writer = XunitWriter(filename or "lettucetests.xml", timestamp)
+    pid = os.getpid()
+    # test cases of a feature run by a worker process, kept until the
+    # feature is done so they can be carried back to this process
+    detached = []
+
+    def write_test_case(tc):
+        xml = tc.toxml()
+        tc.unlink()
+        if os.getpid() == pid:
+            writer.write(xml)
+        else:
+            detached.append(xml)
 
     @after.each_step
     def create_test_case_step(step):
@@ -63,10 +119,7 @@ def enable(filename=None):
         tc = doc.createElement("testcase")
         tc.setAttribute("classname", classname)
         tc.setAttribute("name", step.sentence)
-        try:
-            tc.setAttribute("time", str(total_seconds((datetime.now() - step.started))))
-        except AttributeError:
-            tc.setAttribute("time", str(total_seconds(timedelta(seconds=0))))
+        tc.setAttribute("time", format_seconds(step.duration))
 
         if not step.ran:
             skip = doc.createElement("skipped")
@@ -82,12 +135,7 @@ def enable(filename=None):
             failure.appendChild(cdata)
             tc.appendChild(failure)
 
-        root.appendChild(tc)
-
-    @before.outline
-    def time_outline(scenario, order, outline, reasons_to_fail):
-        scenario.outline_started = datetime.now()
-        pass
+        write_test_case(tc)
 
     @after.outline
     def create_test_case_outline(scenario, order, outline, reasons_to_fail):
@@ -95,7 +143,7 @@ def enable(filename=None):
         tc = doc.createElement("testcase")
         tc.setAttribute("classname", classname)
         tc.setAttribute("name", u'| %s |' % u' | '.join(outline.values()))
-        tc.setAttribute("time", str(total_seconds((datetime.now() - scenario.outline_started))))
+        tc.setAttribute("time", format_seconds(scenario.outline_duration))
 
         for reason_to_fail in reasons_to_fail:
             cdata = doc.createCDATASection(reason_to_fail.traceback)
@@ -104,13 +152,23 @@ def enable(filename=None):
             failure.appendChild(cdata)
             tc.appendChild(failure)
 
-        root.appendChild(tc)
+        write_test_case(tc)
+
+    @after.each_feature
+    def detach_test_cases(feature):
+        # features run by worker processes (see lettuce.Runner's
+        # `processes`) carry their test cases back to this one
+        if os.getpid() == pid:
+            return
+
+        feature.xunit_testcases = list(detached)
+        del detached[:]
+
+    @after.feature_result
+    def adopt_test_cases(feature_result):
+        for xml in getattr(feature_result.feature, 'xunit_testcases', ()):
+            writer.write(xml)
 
     @after.all
     def output_xml(total):
-        root.setAttribute("tests", str(total.steps))
-        root.setAttribute("failures", str(total.steps_failed))
-        root.setAttribute("errors", '0')
-        root.setAttribute("time", '0')
-        doc.appendChild(root)
-        write_xml_doc(output_filename, doc)
+        writer.close(total.steps, total.steps_failed)
@@ -16,35 +16,270 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import re
+import sre_parse
+import sre_constants
 import threading
 import traceback
 
+from collections import OrderedDict
 from lettuce.exceptions import StepLoadingError
+from lettuce.timing import clock
+from lettuce.timing import Durations
 
 world = threading.local()
 world._set = False
 
 
+_abspaths = {}
+
+
+def _function_identity(function):
+    """Returns the absolute path of the file which defines `function`
+    and the line it starts on, which tell apart the callbacks of a hook
+    even when their module is loaded again"""
+    code = function.func_code
+    key = os.getcwd(), code.co_filename
+    path = _abspaths.get(key)
+    if path is None:
+        path = _abspaths[key] = os.path.abspath(code.co_filename)
+
+    return path, code.co_firstlineno
+
+
 def _function_matches(one, other):
-    return (os.path.abspath(one.func_code.co_filename) == os.path.abspath(other.func_code.co_filename) and
-            one.func_code.co_firstlineno == other.func_code.co_firstlineno)
+    return _function_identity(one) == _function_identity(other)
+
+
+def _defined_in(function, filename):
+    """Tells whether `function` comes from the module `filename`, be it
+    its source or its compiled file"""
+    function = getattr(function, '__func__', function)
+    if not hasattr(function, 'func_code'):
+        return False
+
+    path = _function_identity(function)[0]
+    return os.path.splitext(path)[0] == \
+        os.path.splitext(os.path.abspath(filename))[0]
 
 
 class CallbackDict(dict):
+    """The callbacks of each hook, keyed by kind and then by situation.
+
+    `dispatch` maps each (kind, situation) that has callbacks to a tuple
+    of them. It is kept up to date as callbacks are added or cleared, so
+    that call_hook does a single lookup, and hooks without callbacks
+    cost next to nothing.
+    """
+    def __init__(self, *args, **kwargs):
+        super(CallbackDict, self).__init__(*args, **kwargs)
+        # bumped whenever callbacks are dropped, as StepDict.generation
+        self.generation = 0
+        self._identities = {}
+        self._compile()
+
     def append_to(self, where, when, function):
-        if not any(_function_matches(o, function) for o in self[where][when]):
+        identities = self._identities.get((where, when))
+        if identities is None:
+            identities = self._identities[where, when] = set(
+                _function_identity(o) for o in self[where][when])
+
+        identity = _function_identity(function)
+        if identity not in identities:
+            identities.add(identity)
             self[where][when].append(function)
+            self.dispatch[where, when] = tuple(self[where][when])
 
     def clear(self):
         for name, action_dict in self.items():
             for callback_list in action_dict.values():
                 callback_list[:] = []
 
+        self._identities.clear()
+        self.generation += 1
+        self._compile()
+
+    def drop_defined_in(self, filename):
+        """Removes the callbacks defined in the module `filename`, which
+        is about to be loaded again"""
+        for action_dict in self.values():
+            for callback_list in action_dict.values():
+                callback_list[:] = [callback for callback in callback_list
+                                    if not _defined_in(callback, filename)]
+
+        self._identities.clear()
+        self._compile()
+
+    def _compile(self):
+        self.dispatch = dict(
+            ((kind, situation), tuple(callbacks))
+            for kind, action_dict in self.items()
+            for situation, callbacks in action_dict.items() if callbacks)
+
+    def subscriber_counts(self):
+        """Returns the number of callbacks of each hook, keyed by
+        (kind, situation)"""
+        return dict(
+            ((kind, situation), len(callbacks))
+            for kind, action_dict in self.items()
+            for situation, callbacks in action_dict.items())
+
+
+class HookDurations(dict):
+    """How many times each callback was called and how long, in seconds,
+    the calls took, as lettuce.timing.Durations keyed by (kind,
+    situation, callback)"""
+    def record(self, kind, situation, callback, duration):
+        key = kind, situation, callback
+        durations = self.get(key)
+        if durations is None:
+            durations = self[key] = Durations()
+
+        durations.add(duration)
+
+
+REP_WORD = re.compile(r'\w+', re.U)
+
+
+def _words(string):
+    return REP_WORD.findall(string.lower())
+
+
+def _literal_runs(step):
+    """Yields the runs of literal characters that every match of the
+    regex `step` is bound to contain"""
+    run = []
+    for op, av in sre_parse.parse(step):
+        if op == sre_constants.LITERAL:
+            run.append(unichr(av))
+        else:
+            if run:
+                yield u"".join(run)
+            run = []
+    if run:
+        yield u"".join(run)
+
+
+def _index_word(step):
+    """Returns the most selective word that a sentence must contain
+    in order to be matched by the regex `step`, or None when there is
+    no such word.
+
+    Only words delimited on both sides within a literal run are
+    considered, so that they show up as whole words in the sentence.
+    """
+    try:
+        runs = list(_literal_runs(step))
+    except re.error:
+        return None
+
+    best = None
+    for run in runs:
+        run = run.lower()
+        for match in REP_WORD.finditer(run):
+            if match.start() == 0 or match.end() == len(run):
+                continue
+            word = match.group()
+            if best is None or len(word) > len(best):
+                best = word
+
+    return best
+
+
+class StepIndex(object):
+    """Buckets the step definitions of a `StepDict` by a word that any
+    matching sentence must contain, so that only a handful of regexes
+    are tried per sentence. Definitions are kept in the iteration
+    order of the registry, so the first match is the same one a linear
+    scan would find."""
+
+    def __init__(self, steps):
+        self.steps = []
+        self.buckets = {}
+        self.unindexed = []
+        for position, (step, func) in enumerate(steps.items()):
+            self.steps.append((step, func))
+            word = _index_word(step)
+            if word is None:
+                self.unindexed.append(position)
+            else:
+                self.buckets.setdefault(word, []).append(position)
+
+    def candidates(self, sentence):
+        if not isinstance(sentence, unicode):
+            return self.steps
+
+        positions = set(self.unindexed)
+        for word in set(_words(sentence)):
+            positions.update(self.buckets.get(word, ()))
+
+        return [self.steps[position] for position in sorted(positions)]
+
+
+# how many sentences StepDict.match remembers the definition of
+MATCH_CACHE_SIZE = 4096
+
+
 class StepDict(dict):
     def __init__(self, *args, **kwargs):
         super(StepDict, self).__init__(*args, **kwargs)
+        # bumped whenever definitions are dropped, so that loaders know
+        # which modules must be loaded again
+        self.generation = 0
         self._compiled = {}
         self._compiled_ignore_case = {}
+        self._index = None
+        self._matches = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __setitem__(self, step, func):
+        self._invalidate()
+        super(StepDict, self).__setitem__(step, func)
+
+    def __delitem__(self, step):
+        self._invalidate(dropped=True)
+        super(StepDict, self).__delitem__(step)
+
+    def clear(self):
+        self._invalidate(dropped=True)
+        super(StepDict, self).clear()
+
+    def update(self, *args, **kwargs):
+        self._invalidate()
+        super(StepDict, self).update(*args, **kwargs)
+
+    def pop(self, *args):
+        self._invalidate(dropped=True)
+        return super(StepDict, self).pop(*args)
+
+    def popitem(self):
+        self._invalidate(dropped=True)
+        return super(StepDict, self).popitem()
+
+    def setdefault(self, step, func=None):
+        self._invalidate()
+        return super(StepDict, self).setdefault(step, func)
+
+    def drop_defined_in(self, filename):
+        """Removes the step definitions of the module `filename`, which
+        is about to be loaded again. Unlike other removals, this does not
+        make the loaders load every module again."""
+        for step, func in self.items():
+            if _defined_in(func, filename):
+                self._invalidate()
+                super(StepDict, self).__delitem__(step)
+
+    def _invalidate(self, dropped=False):
+        self._index = None
+        self._matches = OrderedDict()
+        if dropped:
+            self.generation += 1
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = StepIndex(self)
+        return self._index
 
     def get_regex(self, step, ignore_case=False):
         if ignore_case:
@@ -59,6 +294,40 @@ class StepDict(dict):
                 self._compiled[step] = regex
         return regex
 
+    def match(self, sentence, ignore_case=False):
+        """Returns a tuple (matched, func) with the match object and the
+        function of the first step definition matching `sentence`, or
+        (None, None) when no definition matches it.
+
+        Which definition matched is memoized per (sentence, ignore_case)
+        until the registry changes, for the MATCH_CACHE_SIZE sentences
+        used last; `cache_hits` and `cache_misses` count lookups.
+        """
+        key = (sentence, ignore_case)
+        found = self._matches.pop(key, None)
+        if found is not None:
+            self.cache_hits += 1
+            self._matches[key] = found
+            step, func = found
+            if step is None:
+                return None, None
+
+            return self.get_regex(step, ignore_case).search(sentence), func
+
+        self.cache_misses += 1
+        found = None, None
+        matched = None
+        for step, func in self.index.candidates(sentence):
+            matched = self.get_regex(step, ignore_case).search(sentence)
+            if matched:
+                found = step, func
+                break
+
+        if len(self._matches) >= MATCH_CACHE_SIZE:
+            self._matches.popitem(last=False)
+        self._matches[key] = found
+        return matched, found[1]
+
     def load(self, step, func):
         self._assert_is_step(step, func)
         self[step] = func
@@ -130,6 +399,7 @@ CALLBACK_REGISTRY = CallbackDict(
         'feature': {
             'before_each': [],
             'after_each': [],
+            'result': [],
         },
         'app': {
             'before_each': [],
@@ -151,8 +421,18 @@ CALLBACK_REGISTRY = CallbackDict(
 )
 
 
+HOOK_DURATIONS = HookDurations()
+
+
 def call_hook(situation, kind, *args, **kw):
-    for callback in CALLBACK_REGISTRY[kind][situation]:
+    callbacks = CALLBACK_REGISTRY.dispatch.get((kind, situation))
+    if callbacks is None:
+        return
+
+    # each callback ends when the next one starts: the clock is read
+    # once per callback
+    started = clock()
+    for callback in callbacks:
         try:
             callback(*args, **kw)
         except Exception as e:
@@ -160,8 +440,13 @@ def call_hook(situation, kind, *args, **kw):
             traceback.print_exc(e)
             print
             raise
+        finally:
+            finished = clock()
+            HOOK_DURATIONS.record(kind, situation, callback, finished - started)
+            started = finished
 
 
 def clear():
     STEP_REGISTRY.clear()
     CALLBACK_REGISTRY.clear()
+    HOOK_DURATIONS.clear()
@@ -83,21 +83,40 @@ def remove_it(string, what):
     return unicode(re.sub(unicode(what), "", unicode(string)).strip())
 
 
+NON_ASCII = re.compile(u'[^\x00-\x7f]')
+
+# width of each non-ascii character seen so far
+_char_widths = {}
+
+
+def _char_width(c):
+    width = _char_widths.get(c)
+    if width is None:
+        width = _char_widths[c] = \
+            unicodedata.east_asian_width(c) in "WF" and 2 or 1
+
+    return width
+
+
 def column_width(string):
-    l = 0
-    for c in unicode(string):
-        if unicodedata.east_asian_width(c) in "WF":
-            l += 2
-        else:
-            l += 1
-    return l
+    string = unicode(string)
+    if not NON_ASCII.search(string):
+        return len(string)
+
+    return sum(map(_char_width, string))
+
+
+def column_widths(strings):
+    """Returns the column width of each of the given strings, such as
+    the cells of a whole table column"""
+    return map(column_width, strings)
 
 
 def rfill(string, times, char=u" ", append=u""):
     string = unicode(string)
     missing = times - column_width(string)
-    for x in range(missing):
-        string += char
+    if missing > 0:
+        string += char * missing
 
     return unicode(string) + unicode(append)
 
@@ -118,14 +137,10 @@ def dicts_to_string(dicts, order):
     def deline(line):
         return line.replace(escape, '\\|')
 
-    keys_and_sizes = dict([(k, getlen(k)) for k in dicts[0].keys()])
-    for key in keys_and_sizes:
-        for data in dicts:
-            current_size = keys_and_sizes[key]
-            value = unicode(data.get(key, ''))
-            size = getlen(value)
-            if size > current_size:
-                keys_and_sizes[key] = size
+    keys_and_sizes = {}
+    for key in dicts[0].keys():
+        column = [key] + [data.get(key, '') for data in dicts]
+        keys_and_sizes[key] = max(column_widths(column)) + 1
 
     names = []
     for key in order:
@@ -197,9 +212,8 @@ def json_to_string(json_list, order):
         temp_maxlen = len(temp_list)
         if temp_maxlen > maxlen:
             maxlen = temp_maxlen
-        for data in temp_list:
-            value = unicode(data)
-            size = getlen(value)
+        if temp_list:
+            size = max(column_widths(temp_list)) + 1
             if size > current_size:
                 key_list[1] = size
         counter += 1
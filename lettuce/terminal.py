@@ -15,11 +15,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import sys
 import platform
 import struct
 
+_size = None
+
+
+def get_size(refresh=False):
+    """Returns the (width, height) of the terminal. It is only queried
+    once, unless `refresh` is given"""
+    global _size
+    if _size is not None and not refresh:
+        return _size
 
-def get_size():
     if platform.system() == "Windows":
         size = get_terminal_size_win()
     else:
@@ -28,9 +37,33 @@ def get_size():
     if not all(size):
         size = (1, 1)
 
+    _size = size
     return size
 
 
+class BufferedWriter(object):
+    """Gathers what an output plugin writes, and hands it to sys.stdout
+    in a single write when flushed.
+
+    sys.stdout is looked up on each flush, since tests and worker
+    processes replace it.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, what):
+        if isinstance(what, unicode):
+            what = what.encode('utf-8')
+        self.chunks.append(what)
+
+    def flush(self):
+        if self.chunks:
+            sys.stdout.write("".join(self.chunks))
+            self.chunks = []
+
+        sys.stdout.flush()
+
+
 def get_terminal_size_win():
     #Windows specific imports
     from ctypes import windll, create_string_buffer
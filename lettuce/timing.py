@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Monotonic, high resolution clock used to time steps, scenarios,
+features and hooks.
+
+Python 2 has no `time.monotonic`, so on Linux CLOCK_MONOTONIC is read
+through ctypes. Elsewhere the best timer of the platform is used.
+"""
+import sys
+import math
+import ctypes
+import ctypes.util
+
+from timeit import default_timer
+
+CLOCK_MONOTONIC = 1  # from <linux/time.h>
+
+
+class timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+def _linux_monotonic_clock():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('rt') or
+                           ctypes.util.find_library('c'), use_errno=True)
+        clock_gettime = libc.clock_gettime
+    except (OSError, AttributeError):
+        return None
+
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def monotonic():
+        now = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.byref(now)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, 'clock_gettime failed')
+
+        return now.tv_sec + now.tv_nsec * 1e-9
+
+    return monotonic
+
+
+try:
+    from time import monotonic as clock
+except ImportError:
+    clock = (sys.platform.startswith('linux') and _linux_monotonic_clock() or
+             default_timer)
+
+
+class Durations(object):
+    """How many times something ran and how long it took: in total, at
+    the least and at the most, and in a histogram from which percentiles
+    are estimated.
+
+    The histogram counts durations in buckets whose bounds grow by
+    BUCKET_GROWTH from SHORTEST on, so an estimate is at most about 10%
+    off, and it never has more than BUCKETS of them, however many times
+    the thing runs.
+    """
+    SHORTEST = 1e-6
+    BUCKET_GROWTH = 2 ** 0.25
+    BUCKETS = 160
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = {}
+
+    def bucket(self, duration):
+        if duration <= self.SHORTEST:
+            return 0
+
+        index = int(math.log(duration / self.SHORTEST, self.BUCKET_GROWTH))
+        return min(index, self.BUCKETS - 1)
+
+    def add(self, duration):
+        self.calls += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+
+        index = self.bucket(duration)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        if not other.calls:
+            return
+
+        self.calls += other.calls
+        self.total += other.total
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if other.max > self.max:
+            self.max = other.max
+
+        for index, count in other.buckets.iteritems():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def percentile(self, percent):
+        """Estimates the duration which `percent` % of the calls took at
+        most, from the middle of its bucket"""
+        if not self.calls:
+            return 0.0
+
+        rank = max(int(math.ceil(self.calls * percent / 100.0)), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                break
+
+        if index == self.BUCKETS - 1:
+            return self.max
+
+        middle = self.SHORTEST * self.BUCKET_GROWTH ** (index + 0.5)
+        return min(max(middle, self.min), self.max)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Watch mode: reruns features as they, or the step definitions they
+use, change.
+
+The process stays up between runs, so the terrain, Django and the step
+definitions which did not change are loaded only once. Files are
+polled, which needs nothing beyond the standard library.
+"""
+import os
+import time
+import traceback
+
+from lettuce import fs
+from lettuce.exceptions import LettuceRunnerError
+
+
+class Watcher(object):
+    """Polls the feature files and step definitions of a Runner every
+    `interval` seconds, and runs again the features they affect"""
+
+    def __init__(self, runner, interval=1.0, sleep=time.sleep):
+        self.runner = runner
+        self.interval = interval
+        self.sleep = sleep
+        self.mtimes = {}
+
+    def scan(self):
+        """Returns the modification time of each feature file and step
+        definitions module"""
+        loader = self.runner.loader
+        loader.rescan()
+        if self.runner.single_feature:
+            files = [fs.FileSystem.abspath(self.runner.single_feature)]
+        else:
+            files = loader.find_feature_files()
+
+        mtimes = {}
+        for filename in files + loader.find_step_definitions_files():
+            try:
+                mtimes[filename] = os.stat(filename).st_mtime
+            except OSError:
+                pass
+
+        return mtimes
+
+    def changes(self):
+        """Returns the files added or modified since the last call"""
+        mtimes = self.scan()
+        changed = set(filename for filename, mtime in mtimes.items()
+                      if self.mtimes.get(filename) != mtime)
+        self.mtimes = mtimes
+        return changed
+
+    def affected_features(self, changed):
+        """Returns the feature files to run again after `changed`: those
+        which changed, and those which used a changed step definitions
+        module or had undefined steps"""
+        features = set(filename for filename in changed
+                       if filename.endswith('.feature'))
+        step_files = set(fs.FileSystem.relpath(filename)
+                         for filename in changed if filename.endswith('.py'))
+        if step_files:
+            for feature, used in self.runner.step_files.items():
+                if (used & step_files or None in used) and feature in self.mtimes:
+                    features.add(feature)
+
+        return sorted(features)
+
+    def run(self, features_files=None):
+        try:
+            return self.runner.run(features_files)
+        except LettuceRunnerError:
+            return None
+        except Exception:
+            # most likely a step definitions module saved half edited,
+            # which fails to import: its next change loads it again
+            print traceback.format_exc()
+            return None
+
+    def watch(self, polls=None):
+        """Runs every feature, then the affected ones on each change.
+        Watches forever unless given a number of `polls`."""
+        self.changes()
+        self.run()
+        print "\nWatching for changes, press Ctrl-C to stop"
+
+        while polls is None or polls > 0:
+            if polls is not None:
+                polls -= 1
+
+            self.sleep(self.interval)
+            features = self.affected_features(self.changes())
+            if features:
+                self.run(features)
+                print "\nWatching for changes, press Ctrl-C to stop"
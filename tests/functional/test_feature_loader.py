@@ -14,9 +14,13 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+from mock import patch
 from nose.tools import assert_equals
-from os.path import dirname, join, abspath
-from lettuce.fs import FeatureLoader
+from os.path import basename, dirname, join, abspath
+from lettuce.fs import FeatureLoader, FeatureCache
 from lettuce.core import Feature, fs
 
 current_dir = abspath(dirname(__file__))
@@ -129,3 +133,79 @@ def test_feature_loaded_from_file_sets_step_line_and_step_filenames():
 
     assert_equals(step4.sentence, "* the result should be 40 on the screen")
     assert_equals(step4.described_at.line, 10)
+
+
+def test_feature_cache_loads_unchanged_features_without_parsing():
+    "Feature.from_file loads an unchanged feature from its cache"
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = FeatureCache(cache_dir, '0.0')
+        feature_file = cjoin('1st_feature_dir', 'more_features_here', 'another.feature')
+
+        parsed = Feature.from_file(feature_file, cache=cache)
+
+        with patch.object(Feature, 'from_string') as from_string:
+            cached = Feature.from_file(feature_file, cache=cache)
+
+        assert not from_string.called, 'the feature should not be parsed again'
+        assert_equals(cached.name, parsed.name)
+        assert_equals([s.name for s in cached.scenarios],
+                      [s.name for s in parsed.scenarios])
+        assert_equals([s.sentence for s in cached.scenarios[0].steps],
+                      [s.sentence for s in parsed.scenarios[0].steps])
+        assert cached.scenarios[0].feature is cached
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_feature_cache_keeps_one_entry_per_feature_file():
+    "lettuce.fs.FeatureCache keeps an entry per file, of its contents and lettuce version"
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = FeatureCache(cache_dir, '0.0')
+        cache.store('some.feature', u'Feature: Something', 'parsed')
+
+        assert_equals(cache.load('some.feature', u'Feature: Something'),
+                      'parsed')
+        assert_equals(cache.load(abspath('some.feature'), u'Feature: Something'),
+                      'parsed')
+        assert_equals(cache.load('some.feature', u'Feature: Something else'),
+                      None)
+        assert_equals(cache.load('other.feature', u'Feature: Something'),
+                      None)
+        assert_equals(FeatureCache(cache_dir, '0.1').load(
+            'some.feature', u'Feature: Something'), None)
+
+        cache.store('some.feature', u'Feature: Something else', 'edited')
+        assert_equals(len(os.listdir(cache_dir)), 1)
+        assert_equals(cache.load('some.feature', u'Feature: Something else'),
+                      'edited')
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_feature_cache_is_shared_by_every_current_dir():
+    "Feature.from_file describes a cached feature relative to the current dir"
+
+    cache_dir = tempfile.mkdtemp()
+    current_dir = os.getcwd()
+    try:
+        cache = FeatureCache(cache_dir, '0.0')
+        feature_file = cjoin('1st_feature_dir', 'more_features_here', 'another.feature')
+        Feature.from_file(feature_file, cache=cache)
+
+        os.chdir(dirname(feature_file))
+        with patch.object(Feature, 'from_string') as from_string:
+            cached = Feature.from_file(basename(feature_file), cache=cache)
+
+        assert not from_string.called, 'the feature should not be parsed again'
+        scenario = cached.scenarios[0]
+        assert_equals(
+            set([cached.described_at.file, scenario.described_at.file] +
+                [step.described_at.file for step in scenario.steps]),
+            set(['another.feature']))
+    finally:
+        os.chdir(current_dir)
+        shutil.rmtree(cache_dir)
@@ -19,9 +19,13 @@
 # Free Software Foundation, Inc., 59 Temple Place - Suite 330,
 # Boston, MA 02111-1307, USA.
 
+import os
+import shutil
+import tempfile
+
 from os.path import abspath, dirname, join, split, curdir
 from nose.tools import assert_equals
-from lettuce.fs import FileSystem
+from lettuce.fs import FileSystem, FeatureLoader
 
 def test_abspath():
     fs = FileSystem()
@@ -85,6 +89,67 @@ def test_non_recursive_locate():
     assert len(files) == 1
     assert split(files[0])[-1] == "test.txt"
 
+def test_scan_prunes_excluded_and_ignored_directories():
+    root = tempfile.mkdtemp()
+    try:
+        for path in ('a.feature', 'steps.py', 'sub/b.feature', 'sub/steps.py',
+                     'node_modules/pkg/gyp.py', '.git/hooks/hook.py',
+                     'build/c.feature', 'sub/tmp/d.feature',
+                     'vendor/e.feature', 'sub/deep/f.feature'):
+            path = join(root, path)
+            if not os.path.isdir(dirname(path)):
+                os.makedirs(dirname(path))
+            open(path, 'w').close()
+
+        with open(join(root, '.gitignore'), 'w') as f:
+            f.write("# build output\nbuild/\n!keep\n")
+        with open(join(root, 'sub', '.gitignore'), 'w') as f:
+            f.write("/tmp\n")
+
+        fs = FileSystem()
+        found = fs.scan(root, ('*.feature', '*.py'), exclude=['vendor'])
+        relative = lambda paths: sorted(os.path.relpath(p, root) for p in paths)
+        assert_equals(relative(found['*.feature']),
+                      ['a.feature', 'sub/b.feature', 'sub/deep/f.feature'])
+        assert_equals(relative(found['*.py']), ['steps.py', 'sub/steps.py'])
+
+        loader = FeatureLoader(root)
+        assert_equals(relative(loader.find_feature_files()),
+                      ['a.feature', 'sub/b.feature', 'sub/deep/f.feature',
+                       'vendor/e.feature'])
+        assert_equals(relative(FeatureLoader(root, exclude=['sub/deep', 'vend*'])
+                               .find_feature_files()),
+                      ['a.feature', 'sub/b.feature'])
+    finally:
+        shutil.rmtree(root)
+
+def test_scan_reads_the_gitignore_files_above_it_within_the_repository():
+    root = tempfile.mkdtemp()
+    try:
+        for path in ('.git/HEAD', 'project/features/a.feature',
+                     'project/features/build/b.feature',
+                     'project/features/sub/cache/c.feature'):
+            path = join(root, path)
+            if not os.path.isdir(dirname(path)):
+                os.makedirs(dirname(path))
+            open(path, 'w').close()
+
+        with open(join(root, '.gitignore'), 'w') as f:
+            f.write("build/\n")
+        with open(join(root, 'project', '.gitignore'), 'w') as f:
+            f.write("/features/sub/cache\n")
+
+        features = join(root, 'project', 'features')
+        found = FileSystem.scan(features, ('*.feature',))
+        assert_equals([os.path.relpath(p, features) for p in found['*.feature']],
+                      ['a.feature'])
+
+        shutil.rmtree(join(root, '.git'))
+        found = FileSystem.scan(features, ('*.feature',))
+        assert_equals(len(found['*.feature']), 3)
+    finally:
+        shutil.rmtree(root)
+
 def test_open_non_abspath():
     fs = FileSystem()
     assert fs.open('tests/functional/data/some.txt', 'r').read() == 'some text here!\n'
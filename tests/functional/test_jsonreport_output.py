@@ -19,6 +19,7 @@
 
 from __future__ import unicode_literals
 from contextlib import contextmanager
+import inspect
 import json
 import os
 import lettuce
@@ -27,6 +28,7 @@ from mock import patch
 from nose.tools import assert_equals, assert_true, with_setup
 from lettuce import registry
 from lettuce import Runner
+from lettuce.core import StepDefinition
 from tests.functional.test_runner import feature_name, bg_feature_name
 from tests.asserts import prepare_stdout
 
@@ -58,6 +60,15 @@ def test_jsonreport_output_with_no_errors():
         runner.run()
 
 
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonreport_output_has_only_the_features_of_its_run():
+    'Test jsonreport output of a second run in the same process'
+    Runner(feature_name('error_traceback'), enable_jsonreport=True).run()
+    with check_jsonreport('commented_feature'):
+        runner = Runner(feature_name('commented_feature'), enable_jsonreport=True)
+        runner.run()
+
+
 @with_setup(prepare_stdout, registry.clear)
 def test_jsonreport_output_with_one_error():
     'Test jsonreport output with one errors'
@@ -120,7 +131,95 @@ def test_jsonreport_output_with_unicode_and_bytestring():
         runner.run()
 
 
+def read_jsonreport_lines(filename="lettucetests.jsonl"):
+    try:
+        with open(filename) as handle:
+            return [json.loads(line) for line in handle]
+    finally:
+        os.remove(filename)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonreport_lines_output_with_one_error():
+    'Test jsonreport lines output writes a record per step, scenario and feature'
+    runner = Runner(feature_name('error_traceback'), enable_jsonreport=True,
+                    jsonreport_lines=True)
+    runner.run()
+    records = read_jsonreport_lines()
+
+    assert_equals([record['type'] for record in records],
+                  ['step', 'scenario', 'step', 'scenario', 'feature', 'total'])
+    passed, failed = records[0], records[2]
+    assert_equals(passed['name'], 'Given my step that passes')
+    assert_equals(passed['scenario'], 'It should pass')
+    assert_equals(passed['feature'], 'Error traceback for output testing')
+    assert_true(isinstance(passed['duration'], float))
+    assert_equals(failed['meta']['failed'], True)
+    assert_true(failed['failure']['exception'].startswith('RuntimeError'))
+    document = OUTPUTS['error_traceback']['features'][0]
+    assert_equals(failed['failure'],
+                  document['scenarios'][1]['steps'][0]['failure'])
+
+    assert_equals(records[3]['meta'], {
+        'total': 1, 'success': 0, 'failures': 1, 'skipped': 0,
+        'undefined': 0})
+    assert_equals(records[4]['meta']['scenarios'], {
+        'total': 2, 'success': 1, 'failures': 1, 'skipped': 0,
+        'undefined': 0})
+    assert_equals(records[5]['meta']['steps']['failures'], 1)
+    assert_true(isinstance(records[5]['duration'], float))
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonreport_lines_output_with_background_section():
+    'Test jsonreport lines output names no scenario for background steps'
+    @lettuce.step(ur'the variable "(\w+)" holds (\d+)')
+    @lettuce.step(ur'the variable "(\w+)" is equal to (\d+)')
+    def just_pass(step, *args):
+        pass
+
+    runner = Runner(bg_feature_name('simple'), enable_jsonreport=True,
+                    jsonreport_lines=True, jsonreport_filename="custom.jsonl")
+    runner.run()
+    records = read_jsonreport_lines("custom.jsonl")
+
+    background, step = records[:2]
+    assert_equals(background['scenario'], None)
+    assert_equals(background['name'], 'Given the variable "X" holds 2')
+    assert_equals(step['scenario'], 'multiplication changing the value')
+    assert_equals(records[2]['meta']['total'], 1)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_jsonreport_lines_output_with_features_run_in_processes():
+    'Test jsonreport lines output gathers the records of worker processes'
+    runner = Runner(os.path.dirname(feature_name('many_successful_features')),
+                    enable_jsonreport=True, jsonreport_lines=True, processes=2)
+    runner.run()
+    records = read_jsonreport_lines()
+
+    assert_equals(
+        sorted(record['name'] for record in records
+               if record['type'] == 'feature'),
+        ['First feature, of many', 'Second feature, of many'])
+    assert_equals(len([r for r in records if r['type'] == 'step']), 4)
+    assert_equals(records[-1]['type'], 'total')
+    assert_equals(records[-1]['meta']['steps']['success'], 4)
+
+
 BASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def line_calling_step_definitions():
+    """Returns the line of StepDefinition.__call__ which calls the step
+    definition, as shown by the tracebacks of failed steps"""
+    lines, first = inspect.getsourcelines(StepDefinition.__call__)
+    for number, line in enumerate(lines, first):
+        if 'ret = self.function(' in line:
+            return number
+
+
+CALL_LINE = line_calling_step_definitions()
 OUTPUTS = {
     "commented_feature": {
         'features': [
@@ -251,7 +350,7 @@ OUTPUTS = {
                             {
                                 "failure": {
                                     "exception": "RuntimeError()",
-                                    "traceback": "Traceback (most recent call last):\n  File \"{path}/lettuce/core.py\", line 144, in __call__\n    ret = self.function(self.step, *args, **kw)\n  File \"{path}/tests/functional/output_features/error_traceback/error_traceback_steps.py\", line 10, in given_my_step_that_blows_a_exception\n    raise RuntimeError\nRuntimeError\n".format(path=BASE_PATH)
+                                    "traceback": "Traceback (most recent call last):\n  File \"{path}/lettuce/core.py\", line {line}, in __call__\n    ret = self.function(self.step, *args, **kw)\n  File \"{path}/tests/functional/output_features/error_traceback/error_traceback_steps.py\", line 10, in given_my_step_that_blows_a_exception\n    raise RuntimeError\nRuntimeError\n".format(path=BASE_PATH, line=CALL_LINE)
                                 },
                                 "meta": {
                                     "failed": True,
@@ -352,7 +451,7 @@ OUTPUTS = {
                             {
                                 "failure": {
                                     "exception": "AssertionError()",
-                                    "traceback": "Traceback (most recent call last):\n  File \"{path}/lettuce/core.py\", line 144, in __call__\n    ret = self.function(self.step, *args, **kw)\n  File \"{path}/tests/functional/output_features/unicode_traceback/unicode_traceback_steps.py\", line 10, in given_my_daemi_that_blows_a_exception\n    assert False\nAssertionError\n".format(path=BASE_PATH)
+                                    "traceback": "Traceback (most recent call last):\n  File \"{path}/lettuce/core.py\", line {line}, in __call__\n    ret = self.function(self.step, *args, **kw)\n  File \"{path}/tests/functional/output_features/unicode_traceback/unicode_traceback_steps.py\", line 10, in given_my_daemi_that_blows_a_exception\n    assert False\nAssertionError\n".format(path=BASE_PATH, line=CALL_LINE)
                                 },
                                 "meta": {
                                     "failed": True,
@@ -626,7 +725,7 @@ OUTPUTS = {
                             {
                                 "failure": {
                                     "exception": "Exception(u'\\u0422\\u0435\\u0441\\u0442',)",
-                                    "traceback": "Traceback (most recent call last):\n  File \"{path}/lettuce/core.py\", line 144, in __call__\n    ret = self.function(self.step, *args, **kw)\n  File \"{path}/tests/functional/output_features/xunit_unicode_and_bytestring_mixing/xunit_unicode_and_bytestring_mixing_steps.py\", line 16, in raise_nonascii_chars\n    raise Exception(word)\nException: \\u0422\\u0435\\u0441\\u0442\n".format(path=BASE_PATH)
+                                    "traceback": "Traceback (most recent call last):\n  File \"{path}/lettuce/core.py\", line {line}, in __call__\n    ret = self.function(self.step, *args, **kw)\n  File \"{path}/tests/functional/output_features/xunit_unicode_and_bytestring_mixing/xunit_unicode_and_bytestring_mixing_steps.py\", line 16, in raise_nonascii_chars\n    raise Exception(word)\nException: \\u0422\\u0435\\u0441\\u0442\n".format(path=BASE_PATH, line=CALL_LINE)
                                 },
                                 "meta": {
                                     "failed": True,
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import json
+import tempfile
+
+from nose.tools import assert_equals, assert_true, with_setup
+from lettuce import registry
+from lettuce import Runner
+from lettuce.terrain import before
+from tests.functional.test_runner import feature_name
+from tests.asserts import prepare_stdout
+
+STEPS_FILE = ('tests/functional/output_features/many_successful_features/'
+              'dumb_steps.py')
+
+
+def run_and_load_profile(**kw):
+    handle, filename = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+
+    @before.each_scenario
+    def set_the_stage(scenario):
+        pass
+
+    runner = Runner(os.path.dirname(feature_name('many_successful_features')),
+                    profile=True, profile_filename=filename, **kw)
+    try:
+        runner.run()
+        with open(filename) as handle:
+            return json.load(handle)
+    finally:
+        os.remove(filename)
+
+
+def assert_profile(profile):
+    assert_equals(
+        sorted((stat['name'], stat['calls']) for stat in profile['steps']),
+        [(STEPS_FILE + ':6', 2), (STEPS_FILE + ':8', 2)])
+
+    for stat in profile['steps'] + profile['hooks']:
+        assert_true(0 <= stat['mean'] <= stat['p95'] * stat['calls'])
+        assert_true(stat['total'] >= stat['p95'])
+
+    hooks = dict((stat['name'].split(' (')[0], stat['calls'])
+                 for stat in profile['hooks'])
+    assert_equals(hooks['before_each scenario: set_the_stage'], 2)
+    assert_true(profile['duration'] > 0)
+    assert_true(profile['discovery']['duration'] > 0)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_profile_reports_step_definitions_and_hooks():
+    'Test profile output times each step definition and hook'
+    assert_profile(run_and_load_profile())
+
+    output = sys.stdout.getvalue()
+    assert_true('Slowest step definitions (top 2 of 2):' in output)
+    assert_true('Slowest hooks' in output)
+    assert_true('Step definitions discovered in' in output)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_profile_gathers_the_timings_of_worker_processes():
+    'Test profile output gathers the timings of worker processes'
+    assert_profile(run_and_load_profile(processes=2))
@@ -15,7 +15,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import sys
+import pstats
 import random
+import shutil
+import tempfile
 import lettuce
 from mock import Mock, patch
 from sure import expect
@@ -24,11 +28,13 @@ from os.path import dirname, join, abspath
 from inspect import currentframe
 
 from nose.tools import assert_equals, with_setup, assert_raises
-from lettuce.fs import FeatureLoader
+from lettuce.fs import FeatureLoader, LastRun
 from lettuce.core import Feature, fs, StepDefinition
 from lettuce.exceptions import LettuceRunnerError
 from lettuce.terrain import world
+from lettuce.watch import Watcher
 from lettuce import Runner
+from lettuce import registry
 
 from tests.asserts import assert_lines
 from tests.asserts import prepare_stderr
@@ -240,6 +246,29 @@ def test_output_with_success_colorful():
     )
 
 
+@with_setup(prepare_stdout)
+def test_output_with_success_colorful_non_tty():
+    "Outside of a terminal, colored steps are printed once, without rewriting them"
+
+    runner = Runner(join(abspath(dirname(__file__)), 'output_features', 'runner_features'), verbosity=3, no_color=False, non_tty=True)
+    runner.run()
+
+    assert_stdout_lines(
+        "\n"
+        "\033[1;37mFeature: Dumb feature                    \033[1;30m# tests/functional/output_features/runner_features/first.feature:1\033[0m\n"
+        "\033[1;37m  In order to test success               \033[1;30m# tests/functional/output_features/runner_features/first.feature:2\033[0m\n"
+        "\033[1;37m  As a programmer                        \033[1;30m# tests/functional/output_features/runner_features/first.feature:3\033[0m\n"
+        "\033[1;37m  I want to see that the output is green \033[1;30m# tests/functional/output_features/runner_features/first.feature:4\033[0m\n"
+        "\n"
+        "\033[1;37m  Scenario: Do nothing                   \033[1;30m# tests/functional/output_features/runner_features/first.feature:6\033[0m\n"
+        "\033[1;32m    Given I do nothing                   \033[1;30m# tests/functional/output_features/runner_features/dumb_steps.py:6\033[0m\n"
+        "\n"
+        "\033[1;37m1 feature (\033[1;32m1 passed\033[1;37m)\033[0m\n"
+        "\033[1;37m1 scenario (\033[1;32m1 passed\033[1;37m)\033[0m\n"
+        "\033[1;37m1 step (\033[1;32m1 passed\033[1;37m)\033[0m\n"
+    )
+
+
 @with_setup(prepare_stdout)
 def test_output_with_success_colorful_newline():
     "A feature with two scenarios should separate the two scenarios with a new line (in color mode)."
@@ -298,6 +327,386 @@ def test_output_with_success_colorless_many_features():
     )
 
 
+@with_setup(prepare_stdout)
+def test_output_with_success_colorless_many_features_in_processes():
+    "Features run in worker processes print the same output as a serial run"
+    runner = Runner(join(abspath(dirname(__file__)), 'output_features', 'many_successful_features'), verbosity=3, no_color=True, processes=2)
+    total = runner.run()
+
+    assert_equals(total.features_ran, 2)
+    assert_equals(total.steps_passed, 4)
+    assert_stdout_lines(
+        "\n"
+        "Feature: First feature, of many              # tests/functional/output_features/many_successful_features/one.feature:1\n"
+        "  In order to make lettuce more robust       # tests/functional/output_features/many_successful_features/one.feature:2\n"
+        "  As a programmer                            # tests/functional/output_features/many_successful_features/one.feature:3\n"
+        "  I want to test its output on many features # tests/functional/output_features/many_successful_features/one.feature:4\n"
+        "\n"
+        "  Scenario: Do nothing                       # tests/functional/output_features/many_successful_features/one.feature:6\n"
+        "    Given I do nothing                       # tests/functional/output_features/many_successful_features/dumb_steps.py:6\n"
+        "    Then I see that the test passes          # tests/functional/output_features/many_successful_features/dumb_steps.py:8\n"
+        "\n"
+        "Feature: Second feature, of many    # tests/functional/output_features/many_successful_features/two.feature:1\n"
+        "  I just want to see it green :)    # tests/functional/output_features/many_successful_features/two.feature:2\n"
+        "\n"
+        "  Scenario: Do nothing              # tests/functional/output_features/many_successful_features/two.feature:4\n"
+        "    Given I do nothing              # tests/functional/output_features/many_successful_features/dumb_steps.py:6\n"
+        "    Then I see that the test passes # tests/functional/output_features/many_successful_features/dumb_steps.py:8\n"
+        "\n"
+        "2 features (2 passed)\n"
+        "2 scenarios (2 passed)\n"
+        "4 steps (4 passed)\n"
+    )
+
+
+@with_setup(prepare_stdout)
+def test_features_stopped_by_undefined_steps_in_processes():
+    "Features run in worker processes stop on undefined steps as a serial run"
+    outcomes = []
+    for processes in (None, 2):
+        prepare_stderr()
+        total = Runner(bjoin(), verbosity=0, processes=processes).run()
+        outcomes.append((total.features_ran, total.scenarios_ran,
+                         total.steps_passed, sys.stderr.getvalue()))
+
+    assert_equals(outcomes[0], outcomes[1])
+    assert 'is not defined' in outcomes[0][-1]
+
+
+@with_setup(prepare_stdout)
+def test_features_can_be_profiled_one_by_one_and_merged():
+    "Runner writes the cProfile stats of each feature and of all of them"
+    directory = tempfile.mkdtemp()
+    try:
+        for processes in (None, 2):
+            runner = Runner(ojoin('many_successful_features'),
+                            pstats_dir=directory, processes=processes)
+            runner.run()
+
+            assert_equals(sorted(os.listdir(directory)), sorted([
+                'merged.pstats',
+                os.path.basename(runner._pstats_filename(
+                    ojoin('many_successful_features', 'one.feature'))),
+                os.path.basename(runner._pstats_filename(
+                    ojoin('many_successful_features', 'two.feature'))),
+            ]))
+
+            stats = pstats.Stats(join(directory, 'merged.pstats'))
+            calls = dict((name, stat[1]) for (path, line, name), stat
+                         in stats.stats.items() if path.endswith('dumb_steps.py'))
+            assert_equals(calls, {'do_nothing': 2, 'see_test_passes': 2})
+
+        names = [os.path.basename(runner._pstats_filename(name))
+                 for name in (join('a', 'b.feature'), 'a.b.feature',
+                              join('..', 'b.feature'))]
+        assert_equals(len(set(names)), 3)
+        assert not any(name.startswith('..') for name in names)
+    finally:
+        shutil.rmtree(directory)
+
+
+RERUN_FEATURE = """
+Feature: Rerun the failures
+  Scenario: First passes
+    Given a step that passes
+  Scenario: Second fails
+    Given a step that fails
+  Scenario: Third passes
+    Given a step that passes
+"""
+
+RERUN_STEPS = """
+from lettuce import step
+
+@step('a step that passes')
+def passes(step):
+    pass
+
+@step('a step that fails')
+def fails(step):
+    assert False
+"""
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_rerun_failed_runs_only_the_scenarios_which_failed():
+    "Runner can rerun only the scenarios which failed in the last run"
+    directory = tempfile.mkdtemp()
+    try:
+        for name, content in (('one.feature', RERUN_FEATURE),
+                              ('two.feature', RERUN_FEATURE.replace(
+                                  'a step that fails', 'a step that passes')),
+                              ('rerun_steps.py', RERUN_STEPS)):
+            with open(join(directory, name), 'w') as f:
+                f.write(content)
+
+        total = Runner(directory).run()
+        assert_equals(total.scenarios_ran, 6)
+
+        last_run = LastRun(join(directory, '.lettuce_cache', 'last_run.json'))
+        failed = {join(directory, 'one.feature'): [2]}
+        assert_equals(last_run.load()['failed'], failed)
+
+        total = Runner(join(directory, 'two.feature')).run()
+        assert_equals(total.scenarios_ran, 3)
+        assert_equals(last_run.load()['failed'], failed)
+
+        total = Runner(directory, scenarios='1').run()
+        assert_equals(total.scenarios_ran, 2)
+        assert_equals(last_run.load()['failed'], failed)
+
+        total = Runner(directory, rerun_failed=True, random=True).run()
+        assert_equals(total.scenarios_ran, 1)
+        assert_equals(total.steps_failed, 1)
+        assert_equals(last_run.load()['failed'], failed)
+
+        last_run.store({})
+        total = Runner(directory, rerun_failed=True).run()
+        assert_equals(total.scenarios_ran, 0)
+        assert_equals(last_run.load()['failed'], {})
+    finally:
+        shutil.rmtree(directory)
+
+
+DISCOVERY_STEPS = """
+from lettuce import step, world
+
+world.discovery_loads = getattr(world, 'discovery_loads', 0) + 1
+
+@step('a discovered step')
+def discovered(step):
+    pass
+"""
+
+
+@with_setup(registry.clear, registry.clear)
+def test_step_definitions_are_not_loaded_again_when_unchanged():
+    "FeatureLoader loads again only the step modules which need it"
+    directory = tempfile.mkdtemp()
+    filename = join(directory, 'discovery_steps.py')
+    world.discovery_loads = 0
+    try:
+        with open(filename, 'w') as f:
+            f.write(DISCOVERY_STEPS)
+
+        def load():
+            loader = FeatureLoader(directory)
+            loader.find_and_load_step_definitions()
+            return (world.discovery_loads, loader.discovery['loaded'],
+                    loader.discovery['unchanged'])
+
+        assert_equals(load(), (1, 1, 0))
+        assert_equals(load(), (1, 0, 1))
+
+        registry.clear()
+        assert_equals(load(), (2, 1, 0))
+
+        with open(filename, 'a') as f:
+            f.write("# changed\n")
+        assert_equals(load(), (3, 1, 0))
+        assert_equals(load(), (3, 0, 1))
+    finally:
+        shutil.rmtree(directory)
+        sys.modules.pop('discovery_steps', None)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_features_can_be_scheduled_after_the_last_run():
+    "Runner can run first the features which failed or took longest"
+    directory = tempfile.mkdtemp()
+    one, two, three = [join(directory, name)
+                       for name in ('one.feature', 'two.feature', 'three.feature')]
+    try:
+        for name, content in ((one, RERUN_FEATURE.replace(
+                                  'a step that fails', 'a step that passes')),
+                              (two, RERUN_FEATURE),
+                              (three, RERUN_FEATURE.replace(
+                                  'a step that fails', 'a step that passes')),
+                              (join(directory, 'rerun_steps.py'), RERUN_STEPS)):
+            with open(name, 'w') as f:
+                f.write(content)
+
+        last_run = LastRun(join(directory, '.lettuce_cache', 'last_run.json'))
+        last_run.store({two: [2]}, {one: 0.5, two: 0.1, three: 2.0})
+
+        runner = Runner(directory, order='failed-first')
+        assert_equals(runner._schedule(sorted([one, two, three]),
+                                       last_run.load()),
+                      [two, one, three])
+
+        runner = Runner(directory, order='longest-first')
+        runner.durations.update(last_run.load()['durations'])
+        assert_equals(runner._schedule(sorted([one, two, three]),
+                                       last_run.load()),
+                      [three, one, two])
+
+        runner.run()
+        durations = last_run.load()['durations']
+        assert_equals(sorted(durations), sorted([one, two, three]))
+        assert durations[three] != 2.0
+    finally:
+        shutil.rmtree(directory)
+
+
+PRINTING_STEPS = """
+from lettuce import step
+
+@step('a step that prints')
+def prints(step):
+    print "printed by the step"
+"""
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_output_of_steps_comes_after_their_scenario():
+    "What a step prints comes after the heading of its scenario"
+    directory = tempfile.mkdtemp()
+    try:
+        with open(join(directory, 'printing.feature'), 'w') as f:
+            f.write(RERUN_FEATURE.replace('a step that fails',
+                                          'a step that prints'))
+        with open(join(directory, 'printing_steps.py'), 'w') as f:
+            f.write(PRINTING_STEPS)
+        with open(join(directory, 'rerun_steps.py'), 'w') as f:
+            f.write(RERUN_STEPS)
+
+        for no_color in (True, False):
+            sys.stdout.truncate(0)
+            Runner(directory, verbosity=3, no_color=no_color).run()
+            output = sys.stdout.getvalue()
+
+            printed = output.index("printed by the step")
+            assert output.index("Scenario: Second fails") < printed
+            assert printed < output.index("Scenario: Third passes")
+    finally:
+        shutil.rmtree(directory)
+        sys.modules.pop('printing_steps', None)
+
+
+WATCHED_STEPS = """
+from lettuce import step
+
+@step('a watched step')
+def watched(step):
+    pass
+"""
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_watch_runs_again_the_features_affected_by_changes():
+    "Watcher runs again only the features whose files or steps changed"
+    directory = tempfile.mkdtemp()
+    one, two = join(directory, 'one.feature'), join(directory, 'two.feature')
+    watched_steps = join(directory, 'watched_steps.py')
+    try:
+        for name, content in ((one, RERUN_FEATURE.replace(
+                                  'a step that fails', 'a step that passes')),
+                              (two, RERUN_FEATURE.replace(
+                                  'a step that fails', 'a watched step')),
+                              (join(directory, 'rerun_steps.py'), RERUN_STEPS),
+                              (watched_steps, WATCHED_STEPS)):
+            with open(name, 'w') as f:
+                f.write(content)
+
+        changes = [watched_steps, one, None]
+
+        def touch(interval):
+            filename = changes.pop(0)
+            if filename:
+                mtime = os.stat(filename).st_mtime + 10
+                os.utime(filename, (mtime, mtime))
+
+        runner = Runner(directory)
+        runs = []
+        run = runner.run
+        runner.run = lambda features_files=None: runs.append(
+            features_files) or run(features_files)
+
+        Watcher(runner, sleep=touch).watch(polls=3)
+        assert_equals(runs, [None, [two], [one]])
+        assert_equals(changes, [])
+    finally:
+        shutil.rmtree(directory)
+        sys.modules.pop('rerun_steps', None)
+        sys.modules.pop('watched_steps', None)
+
+
+HOOKED_STEPS = """
+from lettuce import before, step, world
+
+@before.each_scenario
+def note(scenario):
+    world.hook_calls.append(%r)
+
+@step('a watched step')
+def watched(step):
+    pass
+
+@step(%r)
+def extra(step):
+    pass
+"""
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_watch_runs_the_edited_hooks_and_steps():
+    "Watcher runs the hooks and steps of a module as edited"
+    directory = tempfile.mkdtemp()
+    hooked_steps = join(directory, 'hooked_steps.py')
+    world.hook_calls = []
+    try:
+        with open(join(directory, 'one.feature'), 'w') as f:
+            f.write(RERUN_FEATURE.replace('a step that fails', 'a watched step')
+                    .replace('a step that passes', 'a watched step'))
+        with open(hooked_steps, 'w') as f:
+            f.write(HOOKED_STEPS % ('old', 'a step to remove'))
+
+        def edit(interval):
+            mtime = os.stat(hooked_steps).st_mtime + 10
+            with open(hooked_steps, 'w') as f:
+                f.write("\n\n" + HOOKED_STEPS % ('new', 'a step to keep'))
+            os.utime(hooked_steps, (mtime, mtime))
+
+        Watcher(Runner(directory), sleep=edit).watch(polls=1)
+        assert_equals(world.hook_calls, ['old'] * 3 + ['new'] * 3)
+
+        sentences = [step for step in registry.STEP_REGISTRY]
+        assert 'a step to keep' in sentences
+        assert 'a step to remove' not in sentences
+    finally:
+        shutil.rmtree(directory)
+        sys.modules.pop('hooked_steps', None)
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_watch_keeps_watching_a_module_which_fails_to_load():
+    "Watcher reports a step module which fails to load, and loads it again"
+    directory = tempfile.mkdtemp()
+    hooked_steps = join(directory, 'hooked_steps.py')
+    world.hook_calls = []
+    try:
+        with open(join(directory, 'one.feature'), 'w') as f:
+            f.write(RERUN_FEATURE.replace('a step that fails', 'a watched step')
+                    .replace('a step that passes', 'a watched step'))
+        with open(hooked_steps, 'w') as f:
+            f.write(HOOKED_STEPS % ('old', 'a step'))
+
+        edits = ["def broken(:\n", HOOKED_STEPS % ('new', 'a step')]
+
+        def edit(interval):
+            mtime = os.stat(hooked_steps).st_mtime + 10
+            with open(hooked_steps, 'w') as f:
+                f.write(edits.pop(0))
+            os.utime(hooked_steps, (mtime, mtime))
+
+        Watcher(Runner(directory), sleep=edit).watch(polls=2)
+        assert_equals(world.hook_calls, ['old'] * 3 + ['new'] * 3)
+        assert 'SyntaxError' in sys.stdout.getvalue()
+    finally:
+        shutil.rmtree(directory)
+        sys.modules.pop('hooked_steps', None)
+
+
 @with_setup(prepare_stdout)
 def test_output_with_success_colorful_many_features():
     "Testing the colorful output of many successful features"
@@ -1425,7 +1834,7 @@ def test_output_with_undefined_steps_colorful():
         '\n'
         '\x1b[1;37m  Scenario Outline: Outline scenario with general undefined step \x1b[1;30m# tests/functional/output_features/undefined_steps/undefined_steps.feature:7\x1b[0m\n'
         '\x1b[0;36m    Given this test step passes                                  \x1b[1;30m# tests/functional/output_features/undefined_steps/undefined_steps.py:4\x1b[0m\n'
-        '\x1b[0;33m    When this test step is undefined                             \x1b[1;30m# tests/functional/output_features/undefined_steps/undefined_steps.feature:5\x1b[0m\n'
+        '\x1b[0;33m    When this test step is undefined                             \x1b[1;30m# tests/functional/output_features/undefined_steps/undefined_steps.feature:9\x1b[0m\n'
         '\x1b[0;36m    Then <in> squared is <out>                                   \x1b[1;30m# tests/functional/output_features/undefined_steps/undefined_steps.py:8\x1b[0m\n'
         '\n'
         '\x1b[1;37m  Examples:\x1b[0m\n'
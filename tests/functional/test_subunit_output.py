@@ -253,3 +253,56 @@ def test_subunit_output_undefined_steps():
 
     runner = Runner(feature_name('undefined_steps'), enable_subunit=True)
     runner.run()
+
+
+@with_setup(state.setup, state.teardown)
+def test_subunit_output_truncates_console():
+    """
+    Test Subunit output streams the console in chunks, up to a size
+    """
+
+    state.expect = [
+        Includes({
+            'status': 'success',
+            'details': Includes({
+                'stdout': ContentContains(
+                    'Badg\n[output truncated after 4 bytes]\n'),
+            }),
+        }),
+        Includes({
+            'status': 'success',
+            'details': Includes({
+                'stderr': ContentContains(
+                    'Mush\n[output truncated after 4 bytes]\n'),
+            }),
+        }),
+    ]
+
+    runner = Runner(feature_name('writes_to_console'), enable_subunit=True,
+                    subunit_chunk_size=3, subunit_max_size=4)
+    runner.run()
+
+
+def test_chunked_attachment_sends_chunks():
+    """
+    Test the captured output is sent once a chunk is full
+    """
+
+    class FakeStreamResult(object):
+        def __init__(self):
+            self.packets = []
+
+        def status(self, **kwargs):
+            self.packets.append((kwargs['file_bytes'], kwargs.get('eof', False)))
+
+    streamresult = FakeStreamResult()
+    attachment = subunit_output.ChunkedAttachment(
+        streamresult, 'feature: scenario', 'stdout', chunk_size=4)
+
+    attachment.write('abc')
+    assert_equal(streamresult.packets, [])
+
+    attachment.write(u'defghi')
+    attachment.close()
+    assert_equal(streamresult.packets,
+                 [('abcd', False), ('efgh', False), ('i', False), ('', True)])
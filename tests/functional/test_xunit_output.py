@@ -39,6 +39,16 @@ def assert_xsd_valid(filename, content):
     xmlschema.assertValid(etree.parse(StringIO(content)))
 
 
+def run_and_check(runner, check, filename="lettucetests.xml"):
+    """Runs lettuce and hands the xunit report it wrote to `check`"""
+    try:
+        runner.run()
+        check(filename, open(filename).read())
+    finally:
+        if os.path.exists(filename):
+            os.remove(filename)
+
+
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_output_with_no_errors():
     'Test xunit output with no errors'
@@ -53,13 +63,35 @@ def test_xunit_output_with_no_errors():
         assert_equals(root.find("testcase").get("name"), "Given I do nothing")
         assert_true(float(root.find("testcase").get("time")) > 0)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
     runner = Runner(feature_name('commented_feature'), enable_xunit=True)
-    runner.run()
+    run_and_check(runner, assert_correct_xml)
+
+    assert_equals(1, len(called), "Function not called")
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_xunit_output_with_features_run_in_processes():
+    'Test xunit output gathers the test cases of worker processes'
+    called = []
+
+    def assert_correct_xml(filename, content):
+        called.append(True)
+        assert_xsd_valid(filename, content)
+        root = etree.fromstring(content)
+        assert_equals(root.get("tests"), "4")
+        assert_equals(root.get("failures"), "0")
+        assert_equals(
+            [(tc.get("classname"), tc.get("name")) for tc in root.findall("testcase")],
+            [("First feature, of many : Do nothing", "Given I do nothing"),
+             ("First feature, of many : Do nothing", "Then I see that the test passes"),
+             ("Second feature, of many : Do nothing", "Given I do nothing"),
+             ("Second feature, of many : Do nothing", "Then I see that the test passes")])
+
+    runner = Runner(os.path.dirname(feature_name('many_successful_features')),
+                    enable_xunit=True, processes=2)
+    run_and_check(runner, assert_correct_xml)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -81,13 +113,10 @@ def test_xunit_output_with_one_error():
         assert_true(float(failed.get("time")) > 0)
         assert_true(failed.find("failure") is not None)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
     runner = Runner(feature_name('error_traceback'), enable_xunit=True)
-    runner.run()
+    run_and_check(runner, assert_correct_xml)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -99,14 +128,11 @@ def test_xunit_output_with_different_filename():
         assert_xsd_valid(filename, content)
         assert_equals(filename, "custom_filename.xml")
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
     runner = Runner(feature_name('error_traceback'), enable_xunit=True,
                     xunit_filename="custom_filename.xml")
-    runner.run()
+    run_and_check(runner, assert_correct_xml, "custom_filename.xml")
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_output_with_unicode_characters_in_error_messages():
@@ -115,27 +141,20 @@ def test_xunit_output_with_unicode_characters_in_error_messages():
         called.append(True)
         assert_xsd_valid(filename, content)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
     runner = Runner(feature_name('unicode_traceback'), enable_xunit=True,
                     xunit_filename="custom_filename.xml")
-    runner.run()
+    run_and_check(runner, assert_correct_xml, "custom_filename.xml")
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 @with_setup(prepare_stdout, registry.clear)
 def test_xunit_does_not_throw_exception_when_missing_step_definition():
     def dummy_write(filename, content):
         pass
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = dummy_write
     runner = Runner(feature_name('missing_steps'), enable_xunit=True,
                     xunit_filename="mising_steps.xml")
-    runner.run()
-
-    xunit_output.wrt_output = old
+    run_and_check(runner, dummy_write, "mising_steps.xml")
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -154,13 +173,10 @@ def test_xunit_output_with_no_steps():
         assert_equals(root.find("testcase/skipped").get("type"), "UndefinedStep(Given I do nothing)")
         assert_equals(float(root.find("testcase").get("time")), 0)
 
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
     runner = Runner(feature_name('no_steps_defined'), enable_xunit=True)
-    runner.run()
+    run_and_check(runner, assert_correct_xml)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -190,13 +206,10 @@ def test_xunit_output_with_background_section():
         pass
     
     filename = bg_feature_name('simple')
-    old = xunit_output.wrt_output
-    xunit_output.wrt_output = assert_correct_xml
     runner = Runner(filename, enable_xunit=True)
-    runner.run()
+    run_and_check(runner, assert_correct_xml)
 
     assert_equals(1, len(called), "Function not called")
-    xunit_output.wrt_output = old
 
 
 @with_setup(prepare_stdout, registry.clear)
@@ -205,14 +218,52 @@ def test_xunit_xml_output_with_no_errors():
 
     called = []
 
-    def assert_correct_xml_output(filename, doc):
+    def assert_correct_xml_output(filename, content):
         called.append(True)
-        expect(doc.toxml).when.called.doesnt.throw(UnicodeDecodeError)
+        assert_xsd_valid(filename, content)
 
-    old = xunit_output.write_xml_doc
-    xunit_output.write_xml_doc = assert_correct_xml_output
     runner = Runner(feature_name('xunit_unicode_and_bytestring_mixing'), enable_xunit=True)
-    try:
-        runner.run()
-    finally:
-        xunit_output.write_xml_doc = old
+    expect(run_and_check).when.called_with(
+        runner, assert_correct_xml_output).doesnt.throw(UnicodeDecodeError)
+
+    assert_equals(1, len(called), "Function not called")
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_xunit_output_streams_test_cases():
+    'Test xunit output writes each test case as soon as it is done'
+    written = []
+
+    from lettuce.terrain import after
+
+    @after.each_scenario
+    def read_report(scenario):
+        written.append(open("lettucetests.xml").read())
+
+    def assert_correct_xml(filename, content):
+        assert_xsd_valid(filename, content)
+        assert_equals(etree.fromstring(content).get("tests"), "1")
+
+    runner = Runner(feature_name('commented_feature'), enable_xunit=True)
+    run_and_check(runner, assert_correct_xml)
+
+    assert_equals(len(written), 1)
+    testsuite = etree.fromstring(written[0])
+    assert_equals(testsuite.get("tests"), None)
+    assert_equals(testsuite.find("testcase").get("name"), "Given I do nothing")
+
+
+@with_setup(prepare_stdout, registry.clear)
+def test_xunit_output_adds_up_the_runs_of_a_process():
+    'Test xunit output keeps the test cases of every run of a process'
+    def assert_correct_xml(filename, content):
+        assert_xsd_valid(filename, content)
+        root = etree.fromstring(content)
+        assert_equals(root.get("tests"), "2")
+        assert_equals([tc.get("classname") for tc in root.findall("testcase")],
+                      ["one commented scenario : Do nothing",
+                       "one commented scenario : Do nothing"])
+
+    Runner(feature_name('commented_feature'), enable_xunit=True).run()
+    runner = Runner(feature_name('commented_feature'), enable_xunit=True)
+    run_and_check(runner, assert_correct_xml)
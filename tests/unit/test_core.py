@@ -216,3 +216,43 @@ class TotalResultTestCase(unittest.TestCase):
         total = core.TotalResult()
         total.failed_scenario_locations.append('<scenario location>')
         self.assertFalse(total.is_success)
+
+    def test_streaming_counts_what_output_format_does(self):
+        feature = core.Feature.from_string(FEATURE_TO_STREAM)
+        feature_result = feature.run()
+
+        batch = core.TotalResult([feature_result])
+        batch.output_format()
+        streaming = core.TotalResult(streaming=True)
+        streaming.add_feature_result(feature_result)
+
+        for attr in ('features_ran', 'features_passed', 'scenarios_ran',
+                     'scenarios_passed', 'steps', 'steps_undefined',
+                     'failed_scenario_locations'):
+            self.assertEqual(getattr(streaming, attr), getattr(batch, attr))
+
+    def test_streaming_keeps_no_steps(self):
+        feature = core.Feature.from_string(FEATURE_TO_STREAM)
+        total = core.TotalResult(streaming=True)
+        total.add_feature_result(feature.run())
+
+        summary, = total.feature_results
+        self.assertTrue(isinstance(summary, core.FeatureResultSummary))
+        self.assertEqual(summary.feature_name, u'Streamed results')
+        self.assertEqual(
+            [r.total_steps for r in summary.scenario_results], [2, 1])
+
+        proposed = total.proposed_definitions
+        self.assertEqual(len(proposed), 2)
+        self.assertTrue(all(isinstance(definition, core.ProposedDefinition)
+                            for definition in proposed))
+
+
+FEATURE_TO_STREAM = '''
+Feature: Streamed results
+  Scenario: First
+    Given nothing defines this streamed step
+    And nothing defines this other streamed step
+  Scenario: Second
+    Given nothing defines this streamed step
+'''
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from nose.tools import assert_equals
+from lettuce import parser
+from lettuce.core import Background
+from lettuce.core import Feature
+from lettuce.core import Language
+from lettuce.core import Scenario
+
+FEATURE = """@feature
+Feature: Parsing in a single pass
+  # a comment
+  In order to know where things are
+
+  @first
+  Scenario: First
+    Given I have a step
+    And a table:
+      | key |
+      | one |
+
+  Scenario: Second
+    Given I have a step
+"""
+
+
+def test_tokenize_keeps_line_numbers():
+    "parser.tokenize classifies each line and keeps its number"
+    tokens = [(kind, number) for kind, number, line, value in
+              parser.tokenize(FEATURE.splitlines(), Language())]
+
+    assert_equals(tokens, [
+        (parser.TAGS, 1),
+        (parser.FEATURE, 2),
+        (parser.TEXT, 4),
+        (parser.TAGS, 6),
+        (parser.SCENARIO, 7),
+        (parser.TEXT, 8),
+        (parser.TEXT, 9),
+        (parser.TABLE, 10),
+        (parser.TABLE, 11),
+        (parser.SCENARIO, 13),
+        (parser.TEXT, 14),
+    ])
+
+
+def test_tokenize_without_language_knows_no_keywords():
+    "parser.tokenize without a language takes keyword lines as text"
+    kinds = [kind for kind, number, line, value in
+             parser.tokenize([u'Scenario: not one', u'"""',
+                              u'@not a tag', u'"""'])]
+
+    assert_equals(kinds, [parser.TEXT, parser.MULTILINE,
+                          parser.MULTILINE, parser.MULTILINE])
+
+
+def test_repeated_steps_have_their_own_line_numbers():
+    "Steps which repeat a sentence are described at their own lines"
+    feature = Feature.from_string(FEATURE, with_file=__file__)
+    first, second = feature.scenarios
+
+    assert_equals(feature.tags, ['feature'])
+    assert_equals(first.tags, ['first', 'feature'])
+    assert_equals(first.described_at.line, 7)
+    assert_equals(second.described_at.line, 13)
+    assert_equals([s.described_at.line for s in first.steps], [8, 9])
+    assert_equals([s.described_at.line for s in second.steps], [14])
+    assert_equals(feature.described_at.description_at, (4,))
+
+
+def test_constructors_still_take_raw_lines():
+    "Feature, Scenario and Background can still be built from raw lines"
+    feature = Feature(u'Raw lines', FEATURE.splitlines(), None, FEATURE,
+                      Language())
+    assert_equals([s.name for s in feature.scenarios], ['First', 'Second'])
+    assert_equals(feature.tags, ['feature'])
+    assert_equals(feature.description, u'In order to know where things are')
+
+    scenario = Scenario(u'Raw', [u'Given I have a step', u'And a table:',
+                                 u'| key |', u'| one |'], [], [],
+                        language=Language())
+    assert_equals([s.sentence for s in scenario.steps],
+                  [u'Given I have a step', u'And a table:'])
+    assert_equals(scenario.steps[1].hashes, [{u'key': u'one'}])
+
+    background = Background([u'Given I have a step'], feature)
+    assert_equals([s.sentence for s in background.steps],
+                  [u'Given I have a step'])
+    assert background.steps[0].background is background
+
+
+OUTLINE = """Feature: Examples
+  Scenario Outline: Many tables
+    Given I have <key>
+  Examples: the first ones
+    | key |
+    | one |
+  Examples:
+    | key |
+    | two |
+"""
+
+
+def test_examples_tables_keep_only_their_rows():
+    "The text after Examples: and the headers of later tables are no rows"
+    scenario = Feature.from_string(OUTLINE).scenarios[0]
+
+    assert_equals(scenario.keys, [u'key'])
+    assert_equals(scenario.outlines, [{u'key': u'one'}, {u'key': u'two'}])
@@ -14,9 +14,11 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
-from lettuce.registry import _function_matches, StepDict
+from lettuce import registry
+from lettuce.registry import _function_matches, StepDict, CallbackDict
 from lettuce.exceptions import StepLoadingError
 
+from mock import patch
 from nose.tools import assert_raises, assert_equal
 
 
@@ -135,3 +137,130 @@ def test_StepDict_can_exclude_callable_object_when_load_steps():
     steps.load_steps(no_step)
 
     assert len(steps) == 0
+
+def test_StepDict_match_returns_the_first_matching_definition():
+    u"lettuce.STEP_REGISTRY.match(sentence) finds the same definition as a linear scan"
+    steps = StepDict()
+    for sentence in (u'I have a defined step',
+                     u'I have (\\d+) cucumbers? in my (\\w+)',
+                     u'a person called "(.*)"',
+                     u'(?:Given|When) I press the (\\w+) button',
+                     u'step',
+                     u'.*'):
+        steps.load(sentence, lambda: "")
+
+    for sentence in (u'Given I have a defined step',
+                     u'And I have 5 cucumbers in my basket',
+                     u'When I see a person called "John"',
+                     u'When I press the red button',
+                     u'Then nothing else matches',
+                     u'Given I HAVE A DEFINED STEP'):
+        for ignore_case in (True, False):
+            expected = None, None
+            for step, func in steps.items():
+                matched = steps.get_regex(step, ignore_case).search(sentence)
+                if matched:
+                    expected = matched.re.pattern, func
+                    break
+
+            matched, func = steps.match(sentence, ignore_case)
+            assert_equal((matched.re.pattern, func), expected)
+
+def test_StepDict_match_skips_definitions_missing_a_required_word():
+    u"lettuce.STEP_REGISTRY.match(sentence) only tries definitions sharing a required word"
+    steps = StepDict()
+    steps.load(u'I have a defined step', lambda: "")
+    steps.load(u'I eat (\\d+) cucumbers', lambda: "")
+
+    candidates = [step for step, func in steps.index.candidates(u'Given I eat 3 cucumbers')]
+    assert_equal(candidates, [u'I eat (\\d+) cucumbers'])
+
+def test_StepDict_match_sees_definitions_loaded_after_a_lookup():
+    u"lettuce.STEP_REGISTRY.match(sentence) rebuilds its index when steps are loaded"
+    steps = StepDict()
+    steps.load(u'I have a defined step', lambda: "")
+    assert_equal(steps.match(u'Given I eat 3 cucumbers'), (None, None))
+
+    func = lambda: ""
+    steps.load(u'I eat (\\d+) cucumbers', func)
+    matched, matched_func = steps.match(u'Given I eat 3 cucumbers')
+    assert_equal(matched.groups(), (u'3',))
+    assert_equal(matched_func, func)
+
+def test_StepDict_match_memoizes_resolved_sentences():
+    u"lettuce.STEP_REGISTRY.match(sentence) resolves each sentence only once"
+    steps = StepDict()
+    steps.load(u'I eat (\\d+) cucumbers', lambda: "")
+
+    first = steps.match(u'Given I eat 3 cucumbers', True)
+    second = steps.match(u'Given I eat 3 cucumbers', True)
+    steps.match(u'Given I eat 3 cucumbers', False)
+
+    assert_equal(first[0].groups(), second[0].groups())
+    assert first[1] is second[1]
+    assert_equal(steps.cache_hits, 1)
+    assert_equal(steps.cache_misses, 2)
+
+def test_StepDict_match_cache_is_bounded():
+    u"lettuce.STEP_REGISTRY.match(sentence) forgets the sentences used least recently"
+    steps = StepDict()
+    steps.load(u'I eat (\\d+) cucumbers', lambda: "")
+
+    with patch.object(registry, 'MATCH_CACHE_SIZE', 2):
+        for count in (1, 2, 1, 3):
+            steps.match(u'Given I eat %d cucumbers' % count)
+
+        assert_equal(sorted(sentence for sentence, ignore_case
+                            in steps._matches),
+                     [u'Given I eat 1 cucumbers', u'Given I eat 3 cucumbers'])
+        assert_equal(steps.match(u'Given I eat 1 cucumbers')[0].groups(),
+                     (u'1',))
+
+def test_StepDict_match_cache_is_invalidated_by_load_and_clear():
+    u"lettuce.STEP_REGISTRY.match(sentence) forgets resolved sentences when steps change"
+    steps = StepDict()
+    assert_equal(steps.match(u'Given I eat 3 cucumbers'), (None, None))
+
+    steps.load(u'I eat (\\d+) cucumbers', lambda: "")
+    matched, func = steps.match(u'Given I eat 3 cucumbers')
+    assert_equal(matched.groups(), (u'3',))
+
+    steps.clear()
+    assert_equal(steps.match(u'Given I eat 3 cucumbers'), (None, None))
+    assert_equal(steps.cache_hits, 0)
+    assert_equal(steps.cache_misses, 3)
+
+def test_CallbackDict_dispatch_is_rebuilt_by_append_to_and_clear():
+    u"lettuce.CALLBACK_REGISTRY.dispatch only holds hooks with callbacks"
+    callbacks = CallbackDict({'step': {'before_each': [], 'after_each': []}})
+    assert_equal(callbacks.dispatch, {})
+
+    func = lambda step: None
+    callbacks.append_to('step', 'after_each', func)
+    assert_equal(callbacks.dispatch, {('step', 'after_each'): (func,)})
+    assert_equal(callbacks.subscriber_counts(), {
+        ('step', 'before_each'): 0,
+        ('step', 'after_each'): 1,
+    })
+
+    callbacks.clear()
+    assert_equal(callbacks.dispatch, {})
+    assert_equal(callbacks.subscriber_counts()[('step', 'after_each')], 0)
+
+def test_CallbackDict_append_to_skips_callbacks_defined_at_the_same_place():
+    u"lettuce.CALLBACK_REGISTRY.append_to() ignores a callback whose module was loaded again"
+    callbacks = CallbackDict({'step': {'before_each': [], 'after_each': []}})
+
+    def make_callback():
+        return lambda step: None
+
+    first, reloaded = make_callback(), make_callback()
+    callbacks.append_to('step', 'before_each', first)
+    callbacks.append_to('step', 'before_each', reloaded)
+    callbacks.append_to('step', 'after_each', reloaded)
+    assert_equal(callbacks['step']['before_each'], [first])
+    assert_equal(callbacks['step']['after_each'], [reloaded])
+
+    callbacks.clear()
+    callbacks.append_to('step', 'before_each', reloaded)
+    assert_equal(callbacks['step']['before_each'], [reloaded])
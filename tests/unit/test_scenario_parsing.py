@@ -14,6 +14,7 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from mock import patch
 from sure import expect
 from lettuce.core import Step
 from lettuce.core import Scenario
@@ -355,6 +356,47 @@ def test_solved_steps_also_have_scenario_as_attribute():
     for step in scenario.solved_steps:
         assert_equals(step.scenario, scenario)
 
+def test_solved_steps_share_what_outlines_do_not_change():
+    "Steps solved in scenario outlines share everything but what was substituted"
+    scenario = Scenario.from_string(OUTLINED_SCENARIO_WITH_SUBSTITUTIONS_IN_TABLE)
+    step = scenario.steps[0]
+    solved = step.solve_and_clone({'a': '<b>', 'b': '2'}, True)
+
+    assert solved is not step
+    assert solved.described_at is step.described_at
+    assert solved.keys is step.keys
+    assert_equals(solved.proposed_sentence, step.proposed_sentence)
+    assert_equals(solved.hashes, [
+        {'Parameter': 'a', 'Value': '<b>'},
+        {'Parameter': 'b', 'Value': '2'},
+    ])
+    assert_equals(step.hashes[0]['Value'], '<a>')
+
+def test_outline_steps_are_not_solved_unless_needed():
+    "Outlines are not solved while parsing, nor for scenarios that do not run"
+    with patch.object(Step, 'solve_and_clone') as solve_and_clone:
+        feature = Feature.from_string(OUTLINED_FEATURE)
+        feature.run(tags=['not-tagged-like-this'])
+
+    assert not solve_and_clone.called
+    assert_equals(len(feature.scenarios[0].solved_steps), 12)
+
+def test_max_length_is_computed_once_until_outline_rows_are_added():
+    "The widths of a feature and its scenarios are cached until rows change"
+    feature = Feature.from_string(OUTLINED_FEATURE)
+    scenario = feature.scenarios[0]
+    width = feature.max_length
+
+    with patch.object(Scenario, '_calc_max_length') as calc_max_length:
+        assert_equals(feature.max_length, width)
+        assert_equals(scenario.max_length, width)
+    assert not calc_max_length.called
+
+    scenario.outlines.append({u'input_1': u'1', u'input_2': u'2',
+                              u'button': u'add' + u'_' * width,
+                              u'output': u'3'})
+    assert feature.max_length > width
+
 def test_scenario_outlines_within_feature():
     "Solving scenario outlines within a feature"
     feature = Feature.from_string(OUTLINED_FEATURE)
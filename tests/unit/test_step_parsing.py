@@ -65,6 +65,7 @@ INVALID_MULTI_LINE = '''
 '''.strip()
 
 import string
+import cPickle
 from lettuce.core import Step
 from lettuce.exceptions import LettuceSyntaxError
 from lettuce import strings
@@ -291,3 +292,19 @@ def test_handy_function_for_table_members_fail_giving_assertionerror():
 
 
 
+
+
+def test_steps_survive_pickling_with_attributes_set_by_plugins():
+    "Steps keep both their slots and what plugins attach to them when pickled"
+
+    step = Step.from_string(I_HAVE_TASTY_BEVERAGES)
+    step.started = 'attached by a plugin'
+
+    clone = cPickle.loads(cPickle.dumps(step, cPickle.HIGHEST_PROTOCOL))
+
+    assert_equals(clone.sentence, step.sentence)
+    assert_equals(clone.hashes, step.hashes)
+    assert_equals(clone.hashes.step, clone)
+    assert_equals(clone.described_at.line, step.described_at.line)
+    assert_equals(clone.started, 'attached by a plugin')
+    assert_equals(clone.proposed_sentence, step.proposed_sentence)
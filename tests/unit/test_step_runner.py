@@ -526,3 +526,59 @@ def test_invalid_regex_raise_an_error():
         def step_with_bad_regex(step):
             pass
     assert_raises(StepLoadingError, load_step)
+
+@with_setup(step_runner_environ, step_runner_cleanup)
+def test_steps_scenarios_features_and_hooks_are_timed():
+    "Lettuce records how long each step, scenario, feature and hook took"
+
+    @after.each_step
+    def after_each_step(step):
+        pass
+
+    f = Feature.from_string(FEATURE1)
+    feature_result = f.run()
+
+    scenario_result = feature_result.scenario_results[0]
+    passed, failed = scenario_result.steps_passed + scenario_result.steps_failed
+    undefined, = scenario_result.steps_undefined
+    assert passed.duration > 0
+    assert failed.duration > 0
+    assert_equals(undefined.duration, None)
+
+    assert scenario_result.duration >= passed.duration + failed.duration
+    assert f.scenarios[0].duration >= scenario_result.duration
+    assert f.duration >= f.scenarios[0].duration
+
+    durations = registry.HOOK_DURATIONS[
+        'step', 'after_each', after_each_step]
+    assert_equals(durations.calls, 4)
+    assert 0 <= durations.min <= durations.max <= durations.total
+
+FEATURE_MUTATING_HASHES = """
+Feature: Change the table of a step
+    Scenario Outline: Each row gets its own table
+        Given I rename the person to <name>
+            | name  |
+            | alice |
+
+    Examples:
+        | name |
+        | bob  |
+        | eve  |
+"""
+
+@with_setup(step_runner_environ, step_runner_cleanup)
+def test_outline_rows_do_not_share_the_hashes_of_their_steps():
+    "Changes made to step.hashes in one outline row are not seen by others"
+    seen = []
+
+    @step('I rename the person to (\w+)')
+    def rename(step, name):
+        seen.append(step.hashes.first['name'])
+        step.hashes[0]['name'] = name
+
+    feature = Feature.from_string(FEATURE_MUTATING_HASHES)
+    feature.run()
+
+    assert_equals(seen, ['alice', 'alice'])
+    assert_equals(feature.scenarios[0].steps[0].hashes, [{'name': 'alice'}])
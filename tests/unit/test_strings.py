@@ -142,6 +142,13 @@ def test_column_width_w_number_and_char():
         strings.column_width( u"%s%c" % (u"4209", 0x4209)),
         6
     )
+
+def test_column_widths():
+    "strings.column_widths measures a whole column at once"
+    assert_equals(
+        strings.column_widths([u"ab", u"", u"あいう", 42, u"é"]),
+        [2, 0, 6, 2, 1]
+    )
     
 def test_rfill_simple():
     "strings.rfill simple case"
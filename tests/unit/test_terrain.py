@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import sys
+from mox import IgnoreArg
 from mox import Mox
 from nose.tools import assert_equals
 
@@ -258,25 +259,38 @@ def test_after_each_all_is_executed_before_each_all():
     "terrain.before.each_all and terrain.after.each_all decorators"
     import lettuce
     from lettuce.fs import FeatureLoader
+    from lettuce.fs import LastRun
     world.all_steps = []
 
     mox = Mox()
 
     loader_mock = mox.CreateMock(FeatureLoader)
+    last_run_mock = mox.CreateMock(LastRun)
+    loader_mock.discovery = None
     mox.StubOutWithMock(lettuce.sys, 'path')
     mox.StubOutWithMock(lettuce, 'fs')
     mox.StubOutWithMock(lettuce.fs, 'FileSystem')
     mox.StubOutWithMock(lettuce, 'Feature')
 
-    lettuce.fs.FeatureLoader('some_basepath', None).AndReturn(loader_mock)
+    lettuce.fs.FeatureLoader('some_basepath', None, None).AndReturn(loader_mock)
+    loader_mock.base_dir = 'some_basepath'
+    lettuce.fs.FileSystem.join('some_basepath', '.lettuce_cache',
+                               'last_run.json'). \
+        AndReturn('some_basepath/.lettuce_cache/last_run.json')
+    lettuce.fs.LastRun('some_basepath/.lettuce_cache/last_run.json'). \
+        AndReturn(last_run_mock)
 
     lettuce.sys.path.insert(0, 'some_basepath')
     lettuce.sys.path.remove('some_basepath')
 
     loader_mock.find_feature_files().AndReturn(['some_basepath/foo.feature'])
+    last_run_mock.load().AndReturn(None)
     loader_mock.find_and_load_step_definitions()
-    lettuce.Feature.from_file('some_basepath/foo.feature'). \
+    lettuce.Feature.from_file('some_basepath/foo.feature', cache=None). \
         AndReturn(Feature.from_string(FEATURE2))
+    lettuce.fs.FileSystem.abspath('some_basepath/foo.feature'). \
+        AndReturn('/some_basepath/foo.feature')
+    last_run_mock.store({}, IgnoreArg())
 
     mox.ReplayAll()
 
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# <Lettuce - Behaviour Driven Development for python>
+# Copyright (C) <2010-2012>  Gabriel Falcão <gabriel@nacaolivre.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from nose.tools import assert_equals, assert_true
+from lettuce.timing import Durations
+
+
+def test_durations_estimate_percentiles_in_fixed_size():
+    "Durations estimate percentiles from a bounded number of buckets"
+    durations = Durations()
+    for milliseconds in range(1, 1001) * 20:
+        durations.add(milliseconds / 1000.0)
+
+    assert_equals(durations.calls, 20000)
+    assert_equals(durations.min, 0.001)
+    assert_equals(durations.max, 1.0)
+    assert_true(len(durations.buckets) <= Durations.BUCKETS)
+    assert_true(abs(durations.percentile(95) - 0.95) < 0.95 * 0.1)
+    assert_true(abs(durations.percentile(50) - 0.5) < 0.5 * 0.1)
+
+
+def test_durations_estimates_stay_within_the_calls():
+    "A percentile of Durations is never beyond their shortest or longest"
+    durations = Durations()
+    durations.add(0.3)
+    assert_equals(durations.percentile(95), 0.3)
+
+    durations.add(10 ** 9)
+    assert_equals(durations.percentile(95), 10 ** 9)
+    assert_equals(durations.percentile(1), 0.3)
+
+
+def test_merged_durations_add_up():
+    "Merging Durations adds up their calls, totals and buckets"
+    first, second = Durations(), Durations()
+    for duration in (0.1, 0.2):
+        first.add(duration)
+    second.add(0.4)
+    first.merge(second)
+    first.merge(Durations())
+
+    assert_equals(first.calls, 3)
+    assert_equals(round(first.total, 6), 0.7)
+    assert_equals((first.min, first.max), (0.1, 0.4))
+    assert_equals(sum(first.buckets.values()), 3)
+    assert_equals(first.percentile(100), 0.4)